@@ -0,0 +1,174 @@
+"""Run benchmarks: python -m benchmarks [--cases PATTERN ...] [--output FILE]
+
+Every case runs in a fresh process, so its peak RSS isn't affected by the
+other cases. Results are printed as a table and optionally written to a
+JSON file, which can be passed as --compare to a later run.
+"""
+import argparse
+import datetime
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Benchmark the tree itself, not an installed release
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from . import cases  # noqa: E402
+from . import fixtures  # noqa: E402
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _meta() -> dict:
+    import x6100_webserver
+
+    return {
+        "version": x6100_webserver.__version__,
+        "revision": _git_revision(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _prepare(args) -> dict:
+    """Generate data shared by the cases, return options passed to them."""
+    os.makedirs(args.workdir, exist_ok=True)
+    name = f"db-{args.bands}-{args.digital_modes}-{args.params}-{args.seed}.db"
+    print(f"Preparing data in {args.workdir}", file=sys.stderr)
+    db_path = fixtures.create_db(
+        os.path.join(args.workdir, name), args.bands, args.digital_modes, args.params, args.seed
+    )
+    files_root = os.path.join(args.workdir, "files")
+    os.makedirs(files_root, exist_ok=True)
+    fixtures.create_dir(os.path.join(files_root, "big"), args.files, args.seed)
+    return {
+        "workdir": args.workdir,
+        "db": db_path,
+        "files_root": files_root,
+        "files": args.files,
+        "adif_sizes": args.adif_sizes,
+        "seed": args.seed,
+        "iterations": args.iterations,
+    }
+
+
+def _run(name: str, options: dict) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=cases.run_case, args=(name, options, send))
+    proc.start()
+    send.close()
+    try:
+        result = recv.recv()
+    except EOFError:
+        result = {"error": "case process died"}
+    proc.join()
+    return {"name": name, **result}
+
+
+def _format_rate(result: dict) -> str:
+    if result.get("throughput") is None:
+        return "-"
+    return f"{result['throughput']:,.1f} {result['throughput_unit']}"
+
+
+def _print_table(results: list[dict], baseline: dict):
+    header = f"{'case':<32} {'iter':>6} {'throughput':>22} {'p50 ms':>10} {'p99 ms':>10} {'peak RSS':>10}"
+    if baseline:
+        header += f" {'p50 vs base':>12} {'RSS vs base':>12}"
+    print(header)
+    for r in results:
+        if "error" in r:
+            print(f"{r['name']:<32} error: {r['error']}")
+            continue
+        line = (
+            f"{r['name']:<32} {r['iterations']:>6} {_format_rate(r):>22} "
+            f"{r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['rss_peak_kb'] / 1024:>8.1f}MB"
+        )
+        base = baseline.get(r["name"])
+        if base and "error" not in base:
+            line += f" {_change(r['p50_ms'], base['p50_ms']):>12} {_change(r['rss_peak_kb'], base['rss_peak_kb']):>12}"
+        print(line)
+
+
+def _change(value: float, base: float) -> str:
+    if not base:
+        return "-"
+    return f"{(value - base) / base * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--cases", nargs="*", default=["*"], help="case name patterns, e.g. 'api.*'")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    parser.add_argument("--output", help="write results to JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    parser.add_argument("--workdir", help="directory of generated data, reused between runs",
+                        default=os.path.join(tempfile.gettempdir(), "x6100-benchmarks"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--iterations", type=int, help="override iterations of every case")
+    parser.add_argument("--bands", type=int, default=1000)
+    parser.add_argument("--digital-modes", type=int, default=10000)
+    parser.add_argument("--params", type=int, default=1000000, help="filler rows of params table")
+    parser.add_argument("--files", type=int, default=10000, help="files in the listed directory")
+    parser.add_argument("--adif-sizes", type=lambda x: x.split(","), default=["100K", "10M"],
+                        help="comma separated sizes of synced logs, e.g. 100K,10M,200M")
+    parser.add_argument("--wavelog-latency", type=float, default=0.0,
+                        help="response delay of the stand-in Wavelog server, ms")
+    args = parser.parse_args()
+
+    cases.register_sync_cases(args.adif_sizes)
+    names = [n for n in cases.CASES if any(fnmatch.fnmatchcase(n, p) for p in args.cases)]
+    if args.list:
+        print("\n".join(names))
+        return
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    options = _prepare(args)
+    srv, options["wavelog"] = fixtures.start_wavelog(args.wavelog_latency / 1000)
+    results = []
+    try:
+        for name in names:
+            print(f"Running {name}", file=sys.stderr)
+            results.append(_run(name, options))
+    finally:
+        srv.shutdown()
+
+    _print_table(results, baseline)
+    if args.output:
+        report = {
+            "meta": _meta(),
+            "options": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "list")},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if any("error" in r for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""Benchmark cases, each of them is run in its own process.
+
+A case gets options of the run (paths of the generated data and sizes)
+and returns timings of its iterations with optional extra values.
+"""
+import os
+import random
+import resource
+import shutil
+import time
+import wsgiref.util
+
+from . import fixtures
+
+CASES = {}
+
+
+def case(name: str, iterations: int = 200, warmup: int = 3):
+    def register(func):
+        CASES[name] = (func, iterations, warmup)
+        return func
+
+    return register
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of values."""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def summary(durations: list[float], units: float | None = None, unit: str = "ops", **extra) -> dict:
+    """Summarize iteration durations (seconds).
+
+    Throughput is units (iterations by default) per second of the total time.
+    """
+    total = sum(durations)
+    return {
+        "iterations": len(durations),
+        "total_s": round(total, 6),
+        "throughput": round((len(durations) if units is None else units) / total, 3) if total else None,
+        "throughput_unit": f"{unit}/s",
+        "p50_ms": round(percentile(durations, 50) * 1000, 4),
+        "p99_ms": round(percentile(durations, 99) * 1000, 4),
+        "mean_ms": round(total / len(durations) * 1000, 4),
+        "max_ms": round(max(durations) * 1000, 4),
+        **extra,
+    }
+
+
+def measure(func, iterations: int, warmup: int = 0, before=None, after=None) -> list[float]:
+    """Return durations of func() calls, before() and after() aren't timed."""
+    durations = []
+    for i in range(warmup + iterations):
+        if before:
+            before()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        if after:
+            after()
+        if i >= warmup:
+            durations.append(elapsed)
+    return durations
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _configure(options: dict):
+    from x6100_webserver import settings
+
+    settings.DB_PATH = options["db"]
+    settings.FILEBROWSER_PATH = options["files_root"]
+
+
+def run_case(name: str, options: dict, conn):
+    """Process entry point: run case and send its result to conn."""
+    try:
+        register_sync_cases(options["adif_sizes"])
+        func, iterations, warmup = CASES[name]
+        _configure(options)
+        ctx = Context(options)
+        iterations = options.get("iterations") or iterations
+        rss_base = _peak_rss_kb()
+        result = func(ctx, iterations, warmup)
+        result["rss_base_kb"] = rss_base
+        result["rss_peak_kb"] = _peak_rss_kb()
+        conn.send(result)
+    except BaseException as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+        raise
+    finally:
+        conn.close()
+
+
+class Context:
+    """Lazily created connection and app of the case process."""
+
+    def __init__(self, options: dict):
+        self.options = options
+        self.rnd = random.Random(options["seed"])
+        self._con = None
+        self._app = None
+
+    @property
+    def con(self):
+        from x6100_webserver import db
+
+        if self._con is None:
+            self._con = db.connect(self.options["db"])
+        return self._con
+
+    @property
+    def app(self):
+        """WSGI app with the plugins installed by __main__."""
+        if self._app is None:
+            from x6100_webserver import apps, db, metrics
+
+            apps.app.install(metrics.Plugin())
+            apps.app.install(db.Plugin(db.ConnectionPool(self.options["db"])))
+            self._app = metrics.count_bytes(apps.app)
+        return self._app
+
+    def get(self, path: str, query: str = "") -> int:
+        """Make GET request to the app, return size of the response body."""
+        environ = {}
+        wsgiref.util.setup_testing_defaults(environ)
+        environ.update(REQUEST_METHOD="GET", PATH_INFO=path, QUERY_STRING=query)
+        status = []
+        result = self.app(environ, lambda s, headers, exc_info=None: status.append(s))
+        size = 0
+        try:
+            for chunk in result:
+                size += len(chunk)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        if not status[0].startswith("200"):
+            raise RuntimeError(f"GET {path}?{query}: {status[0]}")
+        return size
+
+    def rollback(self):
+        from x6100_webserver import models
+
+        self.con.rollback()
+        models.end_transaction()
+
+
+# Models
+
+@case("models.read_bands")
+def read_bands(ctx, iterations, warmup):
+    """Load all bands with their params, cache invalidated before every call."""
+    from x6100_webserver import models
+
+    durations = measure(
+        lambda: models.read_bands(ctx.con), iterations, warmup,
+        before=models._invalidate_bands_cache,
+    )
+    return summary(durations, bands=len(models.read_bands(ctx.con)))
+
+
+@case("models.read_bands.cached", iterations=10000)
+def read_bands_cached(ctx, iterations, warmup):
+    from x6100_webserver import models
+
+    durations = measure(lambda: models.read_bands(ctx.con), iterations, warmup)
+    return summary(durations)
+
+
+@case("models.check_overlaps", iterations=10000)
+def check_overlaps(ctx, iterations, warmup):
+    """Validate new bands against the plan, half of them overlap."""
+    from x6100_webserver import models
+
+    index = models.read_band_index(ctx.con)
+    top = fixtures.FIRST_FREQ + len(index) * fixtures.BAND_SLOT
+    candidates = []
+    for i in range(1000):
+        start = ctx.rnd.randrange(fixtures.FIRST_FREQ, top)
+        candidates.append(models.BandParams(name="new", start_freq=start, stop_freq=start + 10_000, type=0))
+    it = iter(candidates * (1 + (iterations + warmup) // len(candidates)))
+
+    def check():
+        try:
+            next(it).check_overlaps(index)
+        except ValueError:
+            pass
+
+    return summary(measure(check, iterations, warmup))
+
+
+@case("models.add_band")
+def add_band(ctx, iterations, warmup):
+    """Validate and insert band in a free slot, rolled back after every call."""
+    from x6100_webserver import models
+
+    count = len(models.read_band_index(ctx.con))
+
+    def add():
+        start, stop = fixtures.free_band_slot(ctx.rnd.randint(1, count - 1))
+        models.add_band(ctx.con, models.BandParams(name="new", start_freq=start, stop_freq=stop, type=0))
+
+    durations = measure(
+        add, iterations, warmup,
+        before=lambda: models.read_band_index(ctx.con), after=ctx.rollback,
+    )
+    return summary(durations, bands=count)
+
+
+@case("models.update_band")
+def update_band(ctx, iterations, warmup):
+    """Validate and move band inside its slot, rolled back after every call."""
+    from x6100_webserver import models
+
+    index = models.read_band_index(ctx.con)
+    count = len(index)
+
+    def update():
+        band = index.get(ctx.rnd.randint(1, count))
+        shift = ctx.rnd.randint(1, fixtures.BAND_SLOT - fixtures.BAND_WIDTH - 1)
+        models.update_band(ctx.con, models.BandParams(
+            id=band.id, name=band.name, type=band.type, params=band.params,
+            start_freq=band.start_freq + shift, stop_freq=band.stop_freq + shift,
+        ))
+
+    durations = measure(
+        update, iterations, warmup,
+        before=lambda: models.read_band_index(ctx.con), after=ctx.rollback,
+    )
+    return summary(durations, bands=count)
+
+
+@case("models.read_params")
+def read_params(ctx, iterations, warmup):
+    """Load server params from the shared params table, cache invalidated before every call."""
+    from x6100_webserver import models
+
+    durations = measure(
+        lambda: models.read_params(ctx.con), iterations, warmup,
+        before=models._invalidate_params_cache,
+    )
+    rows = ctx.con.execute("SELECT COUNT(*) FROM params").fetchone()[0]
+    return summary(durations, rows=rows)
+
+
+@case("models.save_params")
+def save_params(ctx, iterations, warmup):
+    """Save sync progress params and commit, as every uploaded batch does."""
+    from x6100_webserver import db, models
+
+    def save():
+        models.save_params(ctx.con, {"sync_timestamp": time.strftime("%Y/%m/%d %H:%M:%S"), "sync_log_offset": "0"})
+        db.commit(ctx.con)
+
+    return summary(measure(save, iterations, warmup))
+
+
+# API
+
+def _api_case(name, path, query="", table=None, iterations=200):
+    """Register warm and cold (data version bumped before every request) cases of endpoint."""
+    @case(name, iterations=iterations * 10)
+    def warm(ctx, iterations, warmup):
+        sizes = []
+        durations = measure(lambda: sizes.append(ctx.get(path, query)), iterations, warmup)
+        return summary(durations, response_bytes=sizes[-1])
+
+    if table is None:
+        return
+
+    @case(name + ".cold", iterations=iterations)
+    def cold(ctx, iterations, warmup):
+        from x6100_webserver import models
+
+        sizes = []
+        durations = measure(
+            lambda: sizes.append(ctx.get(path, query)), iterations, warmup,
+            before=lambda: models._bump(table),
+        )
+        return summary(durations, response_bytes=sizes[-1])
+
+
+_api_case("api.get_bands", "/api/bands", table="bands")
+_api_case("api.get_digital_modes", "/api/digital_modes", table="digital_modes", iterations=50)
+_api_case("api.digital_modes.nearest", "/api/digital_modes/nearest", "freq=14074000&n=10&label=ft8")
+
+
+# File browser
+
+def _files_case(name, query, cold=False, iterations=200):
+    @case(name, iterations=iterations)
+    def files(ctx, iterations, warmup):
+        from x6100_webserver import filebrowser
+
+        sizes = []
+        durations = measure(
+            lambda: sizes.append(ctx.get("/api/files", query)), iterations, warmup,
+            before=filebrowser._cache.clear if cold else None,
+        )
+        return summary(durations, response_bytes=sizes[-1], files=ctx.options["files"])
+
+
+_files_case("files.list", "path=big")
+_files_case("files.list.cold", "path=big", cold=True, iterations=20)
+_files_case("files.list.by_size", "path=big&sort=size&order=desc")
+_files_case("files.list.page", "path=big&cursor=5000&limit=200")
+
+
+# Wavelog sync
+
+def _sync_case(size: int, label: str):
+    @case(f"sync.run_sync.{label}", iterations=3, warmup=0)
+    def run_sync(ctx, iterations, warmup):
+        """Spool and upload the whole log like a sync job, with a fresh database every time.
+
+        Latencies are of the uploaded batches, throughput is in records.
+        """
+        from x6100_webserver import db, settings, sync
+
+        settings.ADI_LOG_PATH = fixtures.create_adif(
+            os.path.join(ctx.options["workdir"], f"log-{label}.adi"), size, ctx.options["seed"]
+        )
+        config = {"key": "bench", "station_profile_id": "1", "endpoint": ctx.options["wavelog"]}
+        batches = []
+        spool_time = upload_time = 0.0
+        records = nbytes = 0
+        tmp_dir = os.path.join(ctx.options["workdir"], f"sync-{os.getpid()}")
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            for i in range(iterations):
+                con = db.connect(fixtures.create_db(os.path.join(tmp_dir, f"{i}.db")))
+                started = time.perf_counter()
+                # Same steps as sync.run_sync(), timed separately
+                sync.ensure_spool(con)
+                sync.spool_new_records(con)
+                spooled = time.perf_counter()
+                last = [spooled]
+
+                def progress(count, size):
+                    now = time.perf_counter()
+                    batches.append(now - last[0])
+                    last[0] = now
+
+                sync.drain_spool(con, config, progress)
+                finished = time.perf_counter()
+                spool_time += spooled - started
+                upload_time += finished - spooled
+                stats = sync.spool_stats(con)
+                records += stats["sent"]
+                nbytes += os.path.getsize(settings.ADI_LOG_PATH)
+                con.close()
+        finally:
+            shutil.rmtree(tmp_dir)
+        total = spool_time + upload_time
+        result = summary(batches, unit="records")
+        result.update(
+            throughput=round(records / total, 3),
+            runs=iterations,
+            records=records // iterations,
+            log_bytes=nbytes // iterations,
+            mb_per_s=round(nbytes / total / 1e6, 3),
+            spool_s=round(spool_time / iterations, 4),
+            upload_s=round(upload_time / iterations, 4),
+        )
+        return result
+
+    return run_sync
+
+
+def parse_size(value: str) -> int:
+    """Parse size like 512, 100K, 10M or 1G."""
+    value = value.strip().upper()
+    scale = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(value[-1:], 1)
+    return int(float(value.rstrip("KMG")) * scale)
+
+
+def register_sync_cases(sizes: list[str]):
+    for label in sizes:
+        if f"sync.run_sync.{label.strip().upper()}" not in CASES:
+            _sync_case(parse_size(label), label.strip().upper())
@@ -0,0 +1,202 @@
+"""Synthetic databases, ADIF logs, directories and a stand-in Wavelog server.
+
+Everything is generated from a seed, so runs with the same options work on
+the same data. Generated files are reused when they already exist.
+"""
+import gzip
+import http.server
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# Schema of the tables used by the web server, as created by the X6100 GUI
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS params (name TEXT PRIMARY KEY ON CONFLICT REPLACE, val TEXT);
+CREATE TABLE IF NOT EXISTS bands (
+    id INTEGER PRIMARY KEY, name TEXT, start_freq INTEGER, stop_freq INTEGER, type INTEGER
+);
+CREATE TABLE IF NOT EXISTS band_params (
+    bands_id INTEGER, name TEXT, val INTEGER, UNIQUE(bands_id, name) ON CONFLICT REPLACE
+);
+CREATE TABLE IF NOT EXISTS digital_modes (
+    id INTEGER PRIMARY KEY, label TEXT, freq INTEGER, mode INTEGER, type INTEGER
+);
+"""
+
+# Per-band params stored by the GUI
+BAND_PARAMS = (
+    "vfoa_freq", "vfoa_mode", "vfoa_agc", "vfoa_att", "vfoa_pre",
+    "vfob_freq", "vfob_mode", "vfo", "split", "rfg", "sql",
+)
+DIGITAL_LABELS = ("FT8", "FT4", "JS8", "WSPR", "PSK31", "RTTY", "JT65", "Q65")
+
+# Bands are placed in slots of this width with a gap left for added bands
+BAND_SLOT = 200_000
+BAND_WIDTH = 150_000
+FIRST_FREQ = 100_000
+
+_ADIF_HEADER = b"Generated by x6100_webserver benchmarks\n<ADIF_VER:5>3.1.0 <PROGRAMID:5>X6100 <EOH>\n"
+_MODES = ("FT8", "FT4", "SSB", "CW", "RTTY")
+_BANDS = (("160m", 1.84), ("80m", 3.573), ("40m", 7.074), ("20m", 14.074), ("10m", 28.074))
+
+
+def create_db(
+    path: str, bands: int = 0, digital_modes: int = 0, params: int = 0, seed: int = 0
+) -> str:
+    """Create database with synthetic bands, digital modes and params rows.
+
+    Params beside the server ones are filler rows, like the GUI settings
+    sharing the table in a real database.
+    """
+    if os.path.exists(path):
+        return path
+    rnd = random.Random(seed)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+    con = sqlite3.connect(tmp_path)
+    con.executescript(SCHEMA)
+    with con:
+        con.executemany(
+            "INSERT INTO bands (id, name, start_freq, stop_freq, type) VALUES (?, ?, ?, ?, ?)",
+            (
+                (i, f"B{i}", _band_start(i), _band_start(i) + BAND_WIDTH, rnd.randint(0, 1))
+                for i in range(1, bands + 1)
+            ),
+        )
+        con.executemany(
+            "INSERT INTO band_params (bands_id, name, val) VALUES (?, ?, ?)",
+            (
+                (i, name, _band_start(i) if name.endswith("_freq") else rnd.randint(0, 3))
+                for i in range(1, bands + 1)
+                for name in BAND_PARAMS
+            ),
+        )
+        top = FIRST_FREQ + max(bands, 1) * BAND_SLOT
+        con.executemany(
+            "INSERT INTO digital_modes (id, label, freq, mode, type) VALUES (?, ?, ?, ?, ?)",
+            (
+                (i, rnd.choice(DIGITAL_LABELS), rnd.randrange(FIRST_FREQ, top), 3, rnd.randint(0, 1))
+                for i in range(1, digital_modes + 1)
+            ),
+        )
+        con.executemany(
+            "INSERT INTO params (name, val) VALUES (?, ?)",
+            ((f"gui_param_{i}", str(rnd.getrandbits(32))) for i in range(params)),
+        )
+    con.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def _band_start(i: int) -> int:
+    return FIRST_FREQ + (i - 1) * BAND_SLOT
+
+
+def free_band_slot(i: int) -> tuple[int, int]:
+    """Return (start, stop) freqs of the gap after band i."""
+    start = _band_start(i) + BAND_WIDTH
+    return start + 1, _band_start(i + 1) - 1
+
+
+def create_adif(path: str, size: int, seed: int = 0) -> str:
+    """Write ADIF log of at least size bytes with unique QSO records."""
+    if os.path.exists(path):
+        return path
+    rnd = random.Random(seed)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_ADIF_HEADER)
+        written = len(_ADIF_HEADER)
+        i = 0
+        while written < size:
+            chunk = []
+            for _ in range(1000):
+                chunk.append(_adif_record(rnd, i))
+                i += 1
+            data = b"".join(chunk)
+            f.write(data)
+            written += len(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _adif_field(name: str, value: str) -> str:
+    return f"<{name}:{len(value)}>{value} "
+
+
+def _adif_record(rnd: random.Random, i: int) -> bytes:
+    band, freq = rnd.choice(_BANDS)
+    mode = rnd.choice(_MODES)
+    call = f"{rnd.choice('KWNG')}{rnd.randint(0, 9)}{i:06d}"
+    fields = [
+        _adif_field("CALL", call),
+        _adif_field("GRIDSQUARE", f"{rnd.choice('FJKL')}{rnd.choice('MNOP')}{rnd.randint(10, 99)}"),
+        _adif_field("MODE", mode),
+        _adif_field("RST_SENT", "-10" if mode.startswith("FT") else "59"),
+        _adif_field("RST_RCVD", "-12" if mode.startswith("FT") else "57"),
+        _adif_field("QSO_DATE", f"2024{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}"),
+        _adif_field("TIME_ON", f"{i // 3600 % 24:02d}{i // 60 % 60:02d}{i % 60:02d}"),
+        _adif_field("BAND", band),
+        _adif_field("FREQ", f"{freq + rnd.randint(0, 3000) / 1e6:.6f}"),
+        _adif_field("TX_PWR", str(rnd.randint(1, 10))),
+    ]
+    return ("".join(fields) + "<EOR>\n").encode("ascii")
+
+
+def create_dir(path: str, files: int, seed: int = 0) -> str:
+    """Create directory with files of various names, sizes and times."""
+    if os.path.isdir(path):
+        return path
+    rnd = random.Random(seed)
+    tmp_path = path + ".tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    now = time.time()
+    for i in range(files):
+        name = os.path.join(tmp_path, f"{rnd.choice(('rec', 'log', 'img'))}_{i:06d}.{rnd.choice(('wav', 'adi', 'png'))}")
+        with open(name, "wb") as f:
+            f.write(b"\0" * rnd.randint(0, 4096))
+        mtime = now - rnd.randint(3600, 365 * 86400)
+        os.utime(name, (mtime, mtime))
+    os.rename(tmp_path, path)
+    # Listings of directories changed within the last seconds aren't cached
+    os.utime(path, (now - 3600, now - 3600))
+    return path
+
+
+class WavelogHandler(http.server.BaseHTTPRequestHandler):
+    """Accept QSO uploads like the Wavelog API does, after an optional delay."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't let delayed ACKs stall them
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        json.loads(body)
+        if self.latency:
+            time.sleep(self.latency)
+        out = b'{"status":"created"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.send_header("Accept-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_wavelog(latency: float = 0.0) -> tuple[http.server.HTTPServer, str]:
+    """Start stand-in Wavelog server in a thread, return it and its API endpoint."""
+    handler = type("Handler", (WavelogHandler,), {"latency": latency})
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, name="wavelog", daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/index.php/api/qso"
@@ -1 +1,6 @@
+import time
+
 __version__ = "0.0.1"
+
+# Monotonic time of the package import, for startup time and uptime
+START_TIME = time.monotonic()
@@ -1,10 +1,16 @@
 import argparse
+import logging
+import threading
 
 import bottle
-import bottle.ext.sqlite
 
 from . import apps
+from . import assets
+from . import db
+from . import metrics
+from . import server
 from . import settings
+from . import sync
 
 
 def run():
@@ -13,14 +19,45 @@ def run():
     parser.add_argument("--host", help="ip address to listen", default="localhost")
     parser.add_argument("--port", type=int, help="port to listen", default=8080)
     parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--server", help="pool (thread pool server) or any bottle server name", default="pool")
+    parser.add_argument("--workers", type=int, help="request handling threads of pool server", default=settings.HTTP_WORKERS)
+    parser.add_argument("--slow-request-ms", type=float, help="log requests slower than this, 0 disables", default=settings.SLOW_REQUEST_MS)
     parser.add_argument("--filebrowser-path", help="path file browser root", default="/mnt")
+    parser.add_argument("--sync-startup-delay", type=float, help="delay of the first Wavelog upload after start, seconds", default=settings.SYNC_STARTUP_DELAY)
+    parser.add_argument("--sync-batch-records", type=int, help="max QSO records per Wavelog upload request", default=settings.SYNC_BATCH_RECORDS)
+    parser.add_argument("--sync-batch-bytes", type=int, help="max ADIF bytes per Wavelog upload request", default=settings.SYNC_BATCH_BYTES)
+    parser.add_argument("--sync-connect-timeout", type=float, help="Wavelog connect timeout, seconds", default=settings.SYNC_CONNECT_TIMEOUT)
+    parser.add_argument("--sync-read-timeout", type=float, help="Wavelog response timeout, seconds", default=settings.SYNC_READ_TIMEOUT)
+    parser.add_argument("--ntp-deadline", type=float, help="time to wait for NTP replies, seconds", default=settings.NTP_DEADLINE)
     args = parser.parse_args()
-    plugin = bottle.ext.sqlite.Plugin(dbfile=args.db, keyword="dbcon")
-    apps.app.install(plugin)
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
     settings.FILEBROWSER_PATH = args.filebrowser_path
     settings.DB_PATH = args.db
-    apps.sync_poll_task()
-    apps.app.run(host=args.host, port=args.port, debug=args.debug, reloader=args.debug)
+    settings.SYNC_BATCH_RECORDS = args.sync_batch_records
+    settings.SYNC_BATCH_BYTES = args.sync_batch_bytes
+    settings.SYNC_CONNECT_TIMEOUT = args.sync_connect_timeout
+    settings.SYNC_READ_TIMEOUT = args.sync_read_timeout
+    settings.HTTP_WORKERS = args.workers
+    settings.NTP_DEADLINE = args.ntp_deadline
+    settings.SLOW_REQUEST_MS = args.slow_request_ms
+    # Other servers may handle requests in one thread, event streams would block it
+    settings.EVENTS_MAX_CLIENTS = args.workers // 2 if args.server == "pool" else 0
+    # Installed first to wrap the db plugin and measure its commits too
+    apps.app.install(metrics.Plugin())
+    apps.app.install(db.Plugin(db.ConnectionPool(args.db), keyword="dbcon"))
+    # Don't compete with the startup for CPU and network
+    sync.worker.start(delay=args.sync_startup_delay)
+    if args.server == "pool":
+        srv = server.PoolServer(host=args.host, port=args.port, workers=args.workers)
+    else:
+        srv = args.server
+    # Compressing static files takes a while on the radio, do it in the
+    # background instead of in the first page request
+    threading.Thread(target=assets.warm, name="assets-warm", daemon=True).start()
+    bottle.run(metrics.count_bytes(apps.app), server=srv, host=args.host, port=args.port, debug=args.debug, reloader=args.debug)
 
 run()
 4
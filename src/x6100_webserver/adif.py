@@ -0,0 +1,76 @@
+"""Incremental reading of ADIF (.adi) logs."""
+import re
+
+CHUNK_SIZE = 64 * 1024
+MAX_RECORD_SIZE = 1024 * 1024
+
+_TAG = re.compile(rb"<([A-Za-z0-9_]+)(?::(\d+)(?::[A-Za-z])?)?>")
+
+
+def _scan(buf: bytes, pos: int):
+    """Yield (name, value, end) of complete tags in buf starting from pos."""
+    while True:
+        m = _TAG.search(buf, pos)
+        if m is None:
+            return
+        end = m.end()
+        if m.group(2) is not None:
+            end += int(m.group(2))
+            if end > len(buf):
+                return
+        yield m.group(1).lower(), buf[m.end():end], end
+        pos = end
+
+
+def iter_records(f, offset: int = 0, chunk_size: int = CHUNK_SIZE):
+    """Yield (record, end_offset) for complete records after offset.
+
+    f should be opened in binary mode. Record is the raw text up to and
+    including <eor> tag, end_offset is the file position right after it.
+    Header and trailing incomplete record (e.g. one being written right
+    now) are not returned. Only one record is kept in memory at a time.
+    """
+    f.seek(offset)
+    buf = b""
+    base = offset
+    while chunk := f.read(chunk_size):
+        buf += chunk
+        start = 0
+        for name, _, end in _scan(buf, 0):
+            if name == b"eoh":
+                start = end
+            elif name == b"eor":
+                yield buf[start:end].strip(), base + end
+                start = end
+        buf = buf[start:]
+        base += start
+        if len(buf) > MAX_RECORD_SIZE:
+            raise ValueError(f"ADIF record at offset {base} is too long")
+
+
+def iter_batches(records, max_records: int, max_bytes: int):
+    """Group (record, end_offset) pairs into lists limited by count and size.
+
+    A single record larger than max_bytes is returned as its own batch.
+    """
+    batch = []
+    size = 0
+    for record, end in records:
+        if batch and (len(batch) >= max_records or size + len(record) > max_bytes):
+            yield batch
+            batch = []
+            size = 0
+        batch.append((record, end))
+        size += len(record) + 1
+    if batch:
+        yield batch
+
+
+def parse_record(record: bytes) -> dict[str, str]:
+    """Return fields of a single record, names are lowercase."""
+    fields = {}
+    for name, value, _ in _scan(record, 0):
+        if name in (b"eor", b"eoh"):
+            continue
+        fields[name.decode("ascii")] = value.decode("utf-8", errors="replace").strip()
+    return fields
@@ -1,18 +1,23 @@
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from importlib import resources
-import json
 import os
-import pathlib
-import subprocess
 import sqlite3
-
-import urllib.request
-import threading
+import time
 
 import bottle
 
+from . import START_TIME
+from . import assets
+from . import bulk
+from . import db
+from . import events
+from . import filebrowser
+from . import metrics
 from . import models
+from . import qsolog
 from . import settings
+from . import sync
+from . import timezones
 
 app = bottle.Bottle()
 
@@ -20,16 +25,59 @@ bottle.TEMPLATE_PATH += [
     resources.files('x6100_webserver').joinpath('views'),
 ]
 
-STATIC_PATH = resources.files('x6100_webserver').joinpath('static')
+bottle.BaseTemplate.defaults["asset_url"] = assets.url
+
+
+# Conditional GET helpers
+
+
+def _not_modified(etag, modified):
+    if_none_match = bottle.request.get_header("If-None-Match")
+    if if_none_match is not None:
+        tags = [x.strip() for x in if_none_match.split(",")]
+        return etag in tags or "*" in tags
+    if_modified_since = bottle.request.get_header("If-Modified-Since")
+    if if_modified_since is not None:
+        since = bottle.parse_date(if_modified_since.split(";")[0].strip())
+        return since is not None and since >= modified
+    return False
+
+
+def _versioned_json(table, dbcon, load):
+    """Return JSON list of table items returned by load(), encoded in chunks."""
+    models.check_external_changes(dbcon)
+    version, modified = models.data_version(table)
+    etag = f'"{table}-{models.VERSION_EPOCH:x}-{version}"'
+    bottle.response.set_header("ETag", etag)
+    bottle.response.set_header("Last-Modified", bottle.http_date(modified))
+    bottle.response.set_header("Cache-Control", "no-cache")
+    if _not_modified(etag, modified):
+        bottle.response.status = 304
+        return ""
+
+    bottle.response.content_type = 'application/json'
+    return bulk.iter_json(load())
 
 
 # Bands API
 
 @app.get('/api/bands')
 def get_bands(dbcon):
-    bands = models.read_bands(dbcon)
-    bottle.response.content_type = 'application/json'
-    return json.dumps([x.asdict() for x in bands])
+    return _versioned_json("bands", dbcon, lambda: models.read_band_index(dbcon).bands)
+
+
+@app.get('/api/bands/lookup')
+def lookup_band(dbcon):
+    try:
+        freq = int(bottle.request.query.freq)
+    except ValueError:
+        bottle.response.status = 400
+        return {"status": "error", "msg": "freq should be an integer"}
+    band = models.find_band(dbcon, freq)
+    if band is None:
+        bottle.response.status = 404
+        return {"status": "error", "msg": f"No band for freq {freq}"}
+    return band.asdict()
 
 
 @app.put('/api/bands')
@@ -67,13 +115,139 @@ def delete_band(band_id, dbcon):
         return {"status": "error", "msg": str(e)}
 
 
+# Bulk import/export
+
+def _read_bulk_body(from_json, from_csv):
+    if bottle.request.content_type.startswith("text/csv"):
+        return from_csv(bottle.request.body.read().decode("utf-8-sig"))
+    return from_json(bottle.request.json)
+
+
+def _import_replace():
+    mode = bottle.request.query.mode or "replace"
+    if mode not in ("replace", "append"):
+        raise ValueError(f"Unknown import mode: {mode}")
+    return mode == "replace"
+
+
+def _export(name, items, to_csv):
+    fmt = bottle.request.query.format or "json"
+    if fmt == "json":
+        bottle.response.content_type = "application/json"
+        body = bulk.iter_json(items)
+    elif fmt == "csv":
+        bottle.response.content_type = "text/csv; charset=utf-8"
+        body = to_csv(items)
+    else:
+        bottle.response.status = 400
+        return {"status": "error", "msg": f"Unknown export format: {fmt}"}
+    bottle.response.set_header(
+        "Content-Disposition", f'attachment; filename="{name}.{fmt}"'
+    )
+    return body
+
+
+@app.post('/api/bands/bulk')
+def import_bands(dbcon):
+    try:
+        bands = _read_bulk_body(bulk.bands_from_json, bulk.bands_from_csv)
+        count = models.import_bands(dbcon, bands, replace=_import_replace())
+        return {"status": "OK", "count": count}
+    except ValueError as e:
+        bottle.response.status = 400
+        return {"status": "error", "msg": str(e)}
+
+
+@app.get('/api/bands/export')
+def export_bands(dbcon):
+    return _export("bands", models.read_bands(dbcon), bulk.iter_bands_csv)
+
+
+@app.post('/api/digital_modes/bulk')
+def import_digital_modes(dbcon):
+    try:
+        d_modes = _read_bulk_body(
+            bulk.digital_modes_from_json, bulk.digital_modes_from_csv
+        )
+        count = models.import_digital_modes(dbcon, d_modes, replace=_import_replace())
+        return {"status": "OK", "count": count}
+    except ValueError as e:
+        bottle.response.status = 400
+        return {"status": "error", "msg": str(e)}
+
+
+@app.get('/api/digital_modes/export')
+def export_digital_modes(dbcon):
+    return _export(
+        "digital_modes", models.read_digital_modes(dbcon), bulk.iter_digital_modes_csv
+    )
+
+
 # Digital modes routes
 
 @app.get('/api/digital_modes')
 def get_digital_modes(dbcon):
-    d_modes = models.read_digital_modes(dbcon)
-    bottle.response.content_type = 'application/json'
-    return json.dumps([x.asdict() for x in d_modes])
+    return _versioned_json("digital_modes", dbcon, lambda: models.read_digital_mode_index(dbcon).modes)
+
+
+def _int_query(name: str, default: int | None = None) -> int:
+    value = bottle.request.query.get(name)
+    if not value:
+        if default is None:
+            raise ValueError(f"{name} is required")
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} should be an integer")
+
+
+def _with_band(d_modes, bands: models.BandIndex) -> list[dict]:
+    result = []
+    for d_mode in d_modes:
+        item = d_mode.asdict()
+        band = bands.find(d_mode.freq)
+        item["band"] = band.name if band else None
+        result.append(item)
+    return result
+
+
+@app.get('/api/bands/<band_id:int>/digital_modes')
+def get_band_digital_modes(band_id, dbcon):
+    band = models.read_band_index(dbcon).get(band_id)
+    if band is None:
+        bottle.response.status = 404
+        return {"status": "error", "msg": f"No band with id {band_id}"}
+    index = models.read_digital_mode_index(dbcon).select(bottle.request.query.label)
+    return {"digital_modes": [x.asdict() for x in index.in_range(band.start_freq, band.stop_freq)]}
+
+
+@app.get('/api/digital_modes/nearest')
+def get_nearest_digital_modes(dbcon):
+    try:
+        freq = _int_query("freq")
+        count = _int_query("n", 1)
+    except ValueError as e:
+        bottle.response.status = 400
+        return {"status": "error", "msg": str(e)}
+    index = models.read_digital_mode_index(dbcon).select(bottle.request.query.label)
+    d_modes = index.nearest(freq, max(0, min(count, len(index))))
+    return {"digital_modes": _with_band(d_modes, models.read_band_index(dbcon))}
+
+
+@app.get('/api/digital_modes/<direction:re:next|prev>')
+def get_adjacent_digital_mode(direction, dbcon):
+    try:
+        freq = _int_query("freq")
+    except ValueError as e:
+        bottle.response.status = 400
+        return {"status": "error", "msg": str(e)}
+    index = models.read_digital_mode_index(dbcon).select(bottle.request.query.label)
+    d_mode = index.next(freq) if direction == "next" else index.prev(freq)
+    if d_mode is None:
+        bottle.response.status = 404
+        return {"status": "error", "msg": f"No digital mode {'above' if direction == 'next' else 'below'} {freq}"}
+    return _with_band([d_mode], models.read_band_index(dbcon))[0]
 
 
 @app.put('/api/digital_modes')
@@ -110,11 +284,84 @@ def delete_digital_mode(mode_id, dbcon):
         bottle.response.status = 400
         return {"status": "error", "msg": str(e)}
 
+# Batch edits
+
+@app.post('/api/batch')
+def batch(dbcon):
+    """Apply create/update/delete operations on bands and digital modes at once.
+
+    Returns rows of the created and updated items and data versions of the
+    tables, as published in "change" events.
+    """
+    try:
+        ops = bulk.batch_from_json(bottle.request.json)
+        ids = models.apply_batch(dbcon, ops)
+    except ValueError as e:
+        bottle.response.status = 400
+        return {"status": "error", "msg": str(e)}
+    # Committed by apply_batch(), versions are final after this
+    db.end_transaction()
+    indexes = {
+        "bands": models.read_band_index(dbcon),
+        "digital_modes": models.read_digital_mode_index(dbcon),
+    }
+    results = []
+    for op, row_id in zip(ops, ids):
+        item = {"op": op.action, "table": op.table, "id": row_id}
+        if op.action != "delete":
+            row = indexes[op.table].get(row_id)
+            item["row"] = row.asdict() if row is not None else None
+        results.append(item)
+    return {
+        "status": "OK",
+        "results": results,
+        "version": {table: models.data_version(table)[0] for table in models.BATCH_TABLES},
+    }
+
+
+# Health routes
+
+@app.get('/healthz')
+def healthz(dbcon):
+    """Readiness check: the server answers and the database is readable."""
+    try:
+        dbcon.execute("SELECT 1 FROM params LIMIT 1").fetchall()
+    except sqlite3.Error as e:
+        bottle.response.status = 503
+        return {"status": "error", "msg": str(e)}
+    return {"status": "ok", "uptime": round(time.monotonic() - START_TIME, 3)}
+
+
+@app.get('/api/metrics')
+def get_metrics():
+    """Request, SQL and sync metrics in Prometheus text format."""
+    bottle.response.content_type = "text/plain; version=0.0.4; charset=utf-8"
+    return metrics.render()
+
+
+# Events routes
+
+@app.get('/api/events')
+def get_events():
+    if not events.broker.connect():
+        bottle.response.status = 503
+        bottle.response.set_header("Retry-After", "60")
+        return {"status": "error", "msg": "Too many event stream clients"}
+    try:
+        last_id = int(bottle.request.get_header("Last-Event-ID", ""))
+    except ValueError:
+        last_id = None
+    bottle.response.content_type = "text/event-stream"
+    bottle.response.set_header("Cache-Control", "no-cache")
+    bottle.response.set_header("X-Accel-Buffering", "no")
+    return events.broker.stream(last_id)
+
+
 # Main routes
 
 @app.route('/static/<filepath:path>')
 def server_static(filepath):
-    return bottle.static_file(filepath, root=STATIC_PATH)
+    return assets.send(filepath)
 
 
 @app.route('/')
@@ -135,21 +382,71 @@ def digital_modes():
 @app.route('/files/<filepath:path>')
 @app.route('/files/<filepath:path>/')
 def files(filepath=""):
-    path = pathlib.Path(settings.FILEBROWSER_PATH) / filepath
-    if path.is_file():
-        os.sync()
-        response = bottle.static_file(str(path.relative_to(settings.FILEBROWSER_PATH)), root=settings.FILEBROWSER_PATH, download=True)
-        response.set_header("Cache-Control", "private, no-cache, no-store")
-        return response
+    try:
+        path = filebrowser.resolve(filepath)
+    except PermissionError as e:
+        return bottle.HTTPError(403, str(e))
+    if os.path.isfile(path):
+        return filebrowser.send_file(path)
+    elif os.path.isdir(path):
+        archive = bottle.request.query.archive
+        if archive == "zip":
+            return filebrowser.send_zip(path)
+        elif archive:
+            return bottle.HTTPError(400, f"Unsupported archive format: {archive}")
+        return bottle.template('files', path=filepath)
     else:
-        dirs = []
-        files = []
-        for item in sorted(path.iterdir()):
-            if item.is_dir():
-                dirs.append(item.relative_to(path))
-            else:
-                files.append(item.relative_to(path))
-        return bottle.template('files', dirs=dirs, files=files)
+        return bottle.HTTPError(404, "File does not exist.")
+
+
+@app.get('/api/files')
+def get_files():
+    query = bottle.request.query
+    try:
+        return filebrowser.list_dir(
+            query.path,
+            sort=query.sort or "name",
+            order=query.order or "asc",
+            cursor=query.cursor,
+            limit=query.limit or 200,
+        )
+    except PermissionError as e:
+        bottle.response.status = 403
+        return {"status": "error", "msg": str(e)}
+    except (FileNotFoundError, NotADirectoryError) as e:
+        bottle.response.status = 404
+        return {"status": "error", "msg": str(e)}
+    except ValueError as e:
+        bottle.response.status = 400
+        return {"status": "error", "msg": str(e)}
+
+# QSO log routes
+
+@app.route('/qsos')
+def qsos_page():
+    return bottle.template('qsos')
+
+
+@app.get('/api/qsos')
+def get_qsos(dbcon):
+    query = bottle.request.query
+    try:
+        qsolog.ingest(dbcon)
+        items, next_cursor = qsolog.query(
+            dbcon,
+            call=query.call,
+            band=query.band,
+            mode=query.mode,
+            date_from=query.get("from"),
+            date_to=query.to,
+            cursor=query.cursor,
+            limit=query.limit or 50,
+        )
+    except ValueError as e:
+        bottle.response.status = 400
+        return {"status": "error", "msg": str(e)}
+    return {"qsos": items, "next": next_cursor}
+
 
 # Timezone routes
 
@@ -161,29 +458,24 @@ def time_editor():
 
 @app.get('/api/get_time')
 def get_time():
-    tz = timezone(timedelta())
-    server_time = datetime.now(tz).isoformat()
     bottle.response.content_type = 'application/json'
-    return {"server_time": server_time}
+    return events.server_time()
 
 
-def update_time_by_ntp(server_address):
-    ntp_args = ["ntpdate", "-u", server_address]
-    p = subprocess.Popen(
-        ntp_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+def update_time_by_ntp(servers):
+    from . import ntp
+
     try:
-        _, errs = p.communicate(timeout=20)
-    except subprocess.TimeoutExpired:
-        p.kill()
-        _, errs = p.communicate()
+        result = ntp.sync_time(servers, deadline=settings.NTP_DEADLINE)
+    except ntp.NtpError as e:
         bottle.response.status = 500
-        return {"status": "error", "msg": "NTP update timeout"}
-
-    if p.returncode != 0:
+        return {"status": "error", "msg": f"NTP update failed: {e}"}
+    except OSError as e:
         bottle.response.status = 500
-        return {"status": "error", "msg": f"NTP update failed: {errs.decode()}"}
+        return {"status": "error", "msg": f"Failed to set time: {e}"}
 
-    return {"status": "success", "msg": "NTP update successful"}
+    events.publish("time", events.server_time())
+    return {"status": "success", "msg": "NTP update successful", **result}
 
 
 @app.post('/api/update_time')
@@ -196,8 +488,13 @@ def update_time():
         return {"status": "error", "msg": "update_mode is required"}
 
     if update_mode == "ntp":
-        server_address = data.get("server_address")
-        return update_time_by_ntp(server_address)
+        servers = data.get("servers") or [
+            x.strip() for x in (data.get("server_address") or "").split(",") if x.strip()
+        ]
+        if not servers:
+            bottle.response.status = 400
+            return {"status": "error", "msg": "server_address is required"}
+        return update_time_by_ntp(servers)
 
     elif update_mode == "manual":
         manual_time = data.get("manual_time")
@@ -206,10 +503,12 @@ def update_time():
             return {"status": "error", "msg": "manual_time is required"}
 
         try:
-            # Update system time manually
+            # Time is entered in the server timezone
+            from . import ntp
+
             manual_time = datetime.strptime(manual_time, "%Y-%m-%d %H:%M:%S")
-            subprocess.run(
-                ["date", "-s", manual_time.strftime("%Y-%m-%d %H:%M:%S")], check=True)
+            ntp.set_clock(manual_time.timestamp())
+            events.publish("time", events.server_time())
             return {"status": "success", "msg": "Server time updated manually"}
         except Exception as e:
             bottle.response.status = 500
@@ -224,19 +523,19 @@ def update_time():
 def get_timezone():
     """Get the current server timezone."""
     try:
-        p = subprocess.run(["realpath", "/etc/localtime"],
-                           stdout=subprocess.PIPE, check=True)
-        timezone_path = p.stdout.decode().strip()
-        tz_list = timezone_path.split("/posix/")
-        if len(tz_list) < 2:
-            tz_list = timezone_path.split("/zoneinfo/")
-        tz = tz_list[-1]
-        return {"timezone": tz}
-    except Exception as e:
+        return {"timezone": timezones.current()}
+    except OSError as e:
         bottle.response.status = 500
         return {"status": "error", "msg": f"Failed to fetch timezone: {str(e)}"}
 
 
+@app.get('/api/timezones')
+def get_timezones():
+    """List timezones available on the server."""
+    bottle.response.set_header("Cache-Control", "max-age=3600")
+    return {"timezones": timezones.available()}
+
+
 @app.post('/api/set_timezone')
 def set_timezone():
     """Set the server timezone."""
@@ -246,146 +545,51 @@ def set_timezone():
         bottle.response.status = 400
         return {"status": "error", "msg": "Timezone is required"}
 
-    target_tz = f"/usr/share/zoneinfo/{timezone}"
-    if not os.path.exists(target_tz):
-        bottle.response.status = 400
-        return {"status": "error", "msg": f"Invalid timezone: {timezone}"}
-
     try:
-        subprocess.run(["ln", "-sf", target_tz, "/etc/localtime"], check=True)
-        return {"status": "success", "msg": "Timezone updated successfully"}
-    except subprocess.CalledProcessError as e:
+        timezones.set_current(timezone)
+    except ValueError as e:
+        bottle.response.status = 400
+        return {"status": "error", "msg": str(e)}
+    except OSError as e:
         bottle.response.status = 500
         return {"status": "error", "msg": f"Failed to set timezone: {str(e)}"}
+    events.publish("timezone", {"timezone": timezone})
+    return {"status": "success", "msg": "Timezone updated successfully"}
 
 
 # Wavelog Sync routes
 
-import bottle
-import sqlite3
-import threading
-import urllib.request, urllib.error
-import json
-from datetime import datetime
-import settings
-import os
-
-X6100_SYNC_DELAY = 0
-X6100_SYNC_TIMER = None
-
-ADI_LOG_PATH = "/mnt/ft_log.adi"
-
-
-# ---------- 定时任务 ----------
-def sync_poll_task():
-    """周期性任务：读取 ADIF 日志并上传到 Wavelog"""
-    with sqlite3.connect(settings.DB_PATH, check_same_thread=False) as conn:
-        do_sync(conn)
-
-
 # ---------- 页面 ----------
 @app.route('/sync')
-def sync():
+def sync_page():
     return bottle.template('sync')
 
 
 # ---------- 上传逻辑 ----------
 @app.post('/api/do_sync')
-def do_sync(dbcon):
-    """上传通联日志至 Wavelog（仅上传新增部分）"""
+def do_sync():
+    """在后台上传通联日志至 Wavelog（仅上传新增部分），立即返回任务 ID"""
     try:
         data = bottle.request.json or {}
-    except:
+    except Exception:
         data = {}
+    job_id = sync.worker.trigger(data)
+    bottle.response.status = 202
+    return {"status": "queued", "job_id": job_id}
 
-    # 从数据库读取配置
-    if not data.get("key"):
-        cur = dbcon.cursor()
-        mapping = {
-            "key": "sync_key",
-            "endpoint": "sync_endpoint",
-            "delay": "sync_delay",
-            "station_profile_id": "sync_station_profile_id"
-        }
-        for field, name in mapping.items():
-            row = cur.execute("SELECT val FROM params WHERE name = ?", (name,)).fetchone()
-            if row:
-                data[field] = row[0]
-
-    if int(data.get('delay', 0)) <= 0 and not data.get('nodelay'):
-        return "Auto sync disabled (delay=0)."
-
-    # 日志文件检查
-    if not os.path.exists(ADI_LOG_PATH):
-        return f"Log file not found: {ADI_LOG_PATH}"
-
-    # 获取上次同步偏移量
-    cur = dbcon.cursor()
-    row = cur.execute("SELECT val FROM params WHERE name = ?", ("sync_log_offset",)).fetchone()
-    last_offset = int(row[0]) if row else 0
-
-    # 打开文件并读取新内容
-    filesize = os.path.getsize(ADI_LOG_PATH)
-    if filesize <= last_offset:
-        return "No new QSO records to upload."
-
-    with open(ADI_LOG_PATH, "r", encoding="utf-8", errors="ignore") as f:
-        f.seek(last_offset)
-        new_data = f.read().strip()
-
-    if not new_data:
-        return "No new QSO data found."
-
-    payload = {
-        "key": data["key"],
-        "station_profile_id": data["station_profile_id"],
-        "type": "adif",
-        "string": new_data
-    }
 
-    # 启动定时任务（除测试模式外）
-    global X6100_SYNC_DELAY, X6100_SYNC_TIMER
-    if not data.get('nodelay'):
-        X6100_SYNC_DELAY = int(data['delay'])
-        if X6100_SYNC_DELAY > 0:
-            X6100_SYNC_TIMER = threading.Timer(X6100_SYNC_DELAY, sync_poll_task)
-            X6100_SYNC_TIMER.start()
-
-    # 准备 HTTP 请求
-    req = urllib.request.Request(
-        data['endpoint'],
-        data=json.dumps(payload).encode('utf-8'),
-        headers={"Content-Type": "application/json", "Accept": "application/json"},
-        method="POST"
-    )
+@app.get('/api/sync/status')
+def sync_status(dbcon):
+    status = sync.worker.status()
+    status["spool"] = sync.spool_stats(dbcon)
+    return status
 
-    try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            if resp.status == 200:
-                # 上传成功后记录新的偏移量和时间戳
-                timestamp = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-                new_offset = filesize
-
-                cur.execute("SELECT val FROM params WHERE name = ?", ("sync_timestamp",))
-                if cur.fetchone():
-                    cur.execute("UPDATE params SET val = ? WHERE name = ?", (timestamp, "sync_timestamp"))
-                else:
-                    cur.execute("INSERT INTO params (name, val) VALUES (?, ?)", ("sync_timestamp", timestamp))
-
-                cur.execute("SELECT val FROM params WHERE name = ?", ("sync_log_offset",))
-                if cur.fetchone():
-                    cur.execute("UPDATE params SET val = ? WHERE name = ?", (new_offset, "sync_log_offset"))
-                else:
-                    cur.execute("INSERT INTO params (name, val) VALUES (?, ?)", ("sync_log_offset", new_offset))
-                dbcon.commit()
-
-                return f"Upload successful ({filesize - last_offset} bytes)."
-            else:
-                return f"HTTP {resp.status}"
-    except urllib.error.HTTPError as e:
-        return f"HTTP Error {e.code}: {e.reason}"
-    except urllib.error.URLError as e:
-        return f"URL Error: {e.reason}"
+
+@app.post('/api/sync/requeue')
+def sync_requeue(dbcon):
+    """Queue records rejected by the server for upload again"""
+    count = sync.requeue_rejected(dbcon)
+    return {"status": "ok", "requeued": count}
 
 
 # ---------- 保存配置 ----------
@@ -395,31 +599,15 @@ def save_sync(dbcon):
     if not data:
         return {"error": "No JSON received"}
 
-    mapping = {
-        "key": "sync_key",
-        "endpoint": "sync_endpoint",
-        "delay": "sync_delay",
-        "station_profile_id": "sync_station_profile_id"
-    }
-
-    cur = dbcon.cursor()
-    for field, name in mapping.items():
-        val = str(data.get(field, ''))
-        row = cur.execute("SELECT val FROM params WHERE name = ?", (name,)).fetchone()
-        if row:
-            cur.execute("UPDATE params SET val = ? WHERE name = ?", (val, name))
-        else:
-            cur.execute("INSERT INTO params (name, val) VALUES (?, ?)", (name, val))
+    models.save_params(
+        dbcon, {name: str(data.get(field, '')) for field, name in sync.CONFIG_PARAMS.items()}
+    )
     dbcon.commit()
 
     # 重启定时任务
-    global X6100_SYNC_DELAY, X6100_SYNC_TIMER
-    if X6100_SYNC_TIMER and X6100_SYNC_TIMER.is_alive():
-        X6100_SYNC_TIMER.cancel()
-    X6100_SYNC_DELAY = int(data['delay'])
-    if X6100_SYNC_DELAY > 0:
-        X6100_SYNC_TIMER = threading.Timer(X6100_SYNC_DELAY, sync_poll_task)
-        X6100_SYNC_TIMER.start()
+    sync.worker.reschedule(
+        sync.to_int(data.get('delay')), watch=sync.to_int(data.get('watch')) > 0
+    )
 
     return {"status": "ok"}
 
@@ -433,14 +621,9 @@ def get_sync(dbcon):
         "delay": "sync_delay",
         "timestamp": "sync_timestamp",
         "station_profile_id": "sync_station_profile_id",
+        "watch": "sync_watch",
         "log_offset": "sync_log_offset"
     }
 
-    result = {}
-    cur = dbcon.cursor()
-    for field, name in mapping.items():
-        row = cur.execute("SELECT val FROM params WHERE name = ?", (name,)).fetchone()
-        if row:
-            result[field] = row[0]
-
-    return result
+    params = models.read_params(dbcon)
+    return {field: params[name] for field, name in mapping.items() if name in params}
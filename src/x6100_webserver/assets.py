@@ -0,0 +1,167 @@
+"""Static files served from memory with fingerprinted URLs.
+
+Files are loaded once, by warm() in the background after startup or on
+first use, whichever comes first. Each of them gets a URL with a hash
+of its content (css/base.css -> css/base.1a2b3c4d5e.css) which browsers
+may cache forever, and gzip and brotli (if the module is installed)
+variants compressed in advance.
+"""
+import gzip
+import hashlib
+from importlib import resources
+import logging
+import re
+import threading
+
+import bottle
+
+logger = logging.getLogger(__name__)
+
+STATIC_PATH = resources.files('x6100_webserver').joinpath('static')
+
+# Compressed variants saving less than this part of the size aren't kept
+MIN_SAVING = 0.1
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_FINGERPRINT_RE = re.compile(r"^(.+)\.[0-9a-f]{10}(\.[^./]+)$")
+# Preferred first
+_ENCODINGS = ("br", "gzip")
+
+
+class Asset:
+    __slots__ = ("path", "url", "digest", "content_type", "variants")
+
+    def __init__(self, path: str, data: bytes, content_type: str, compressors: dict):
+        self.path = path
+        self.digest = hashlib.sha256(data).hexdigest()[:10]
+        stem, dot, ext = path.rpartition(".")
+        self.url = f"{stem}.{self.digest}.{ext}" if dot and "/" not in ext else f"{path}.{self.digest}"
+        self.content_type = content_type
+        self.variants = {"identity": data}
+        for encoding, compress in compressors.items():
+            compressed = compress(data)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                self.variants[encoding] = compressed
+
+
+_lock = threading.Lock()
+_assets: dict[str, Asset] | None = None
+
+
+def _walk(path, prefix=""):
+    for item in path.iterdir():
+        if item.is_dir():
+            yield from _walk(item, f"{prefix}{item.name}/")
+        else:
+            yield f"{prefix}{item.name}", item
+
+
+def _content_type(path: str) -> str:
+    # mimetypes reads system type maps on init, load it with the first asset
+    import mimetypes
+
+    mimetype, _ = mimetypes.guess_type(path)
+    mimetype = mimetype or "application/octet-stream"
+    if mimetype.startswith("text/") or mimetype == "application/javascript":
+        mimetype += "; charset=UTF-8"
+    return mimetype
+
+
+def _load() -> dict[str, Asset]:
+    """Return assets by both plain and fingerprinted path."""
+    global _assets
+    with _lock:
+        if _assets is None:
+            compressors = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+            try:
+                import brotli
+            except ImportError:
+                pass
+            else:
+                compressors["br"] = lambda data: brotli.compress(data, quality=11)
+            assets = {}
+            for path, item in _walk(STATIC_PATH):
+                asset = Asset(path, item.read_bytes(), _content_type(path), compressors)
+                assets[asset.path] = asset
+                assets[asset.url] = asset
+            _assets = assets
+        return _assets
+
+
+def warm():
+    """Load and compress static files, so the first page doesn't wait for it."""
+    try:
+        _load()
+    except Exception:
+        # Retried on first use, where the error reaches the request
+        logger.exception("Can't load static files")
+
+
+def url(path: str) -> str:
+    """Return fingerprinted URL of static file, e.g. url("css/base.css")."""
+    asset = _load().get(path)
+    return "/static/" + (asset.url if asset is not None else path)
+
+
+def _accepted(header: str) -> dict[str, float]:
+    """Parse Accept-Encoding header into quality values by coding."""
+    result = {}
+    for part in header.split(","):
+        coding, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding.strip():
+            result[coding.strip().lower()] = q
+    return result
+
+
+def _choose_encoding(asset: Asset, accept_encoding: str) -> str:
+    accepted = _accepted(accept_encoding)
+    for encoding in _ENCODINGS:
+        if encoding in asset.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def send(filepath: str) -> bottle.HTTPResponse:
+    """Return response with static file, compressed if the client accepts it.
+
+    Fingerprinted URLs are cached by browsers for a year without
+    revalidation, plain ones (and old fingerprints) are revalidated with
+    ETag on every use.
+    """
+    assets = _load()
+    asset = assets.get(filepath)
+    if asset is None:
+        match = _FINGERPRINT_RE.match(filepath)
+        if match is not None:
+            asset = assets.get(match.group(1) + match.group(2))
+    if asset is None:
+        return bottle.HTTPError(404, "File does not exist.")
+
+    encoding = _choose_encoding(asset, bottle.request.get_header("Accept-Encoding", ""))
+    etag = f'"{asset.digest}-{encoding}"'
+    headers = {
+        "Content-Type": asset.content_type,
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": IMMUTABLE if filepath == asset.url else "no-cache",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    if_none_match = bottle.request.get_header("If-None-Match")
+    if if_none_match is not None:
+        tags = [x.strip() for x in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return bottle.HTTPResponse(status=304, **headers)
+
+    body = asset.variants[encoding]
+    headers["Content-Length"] = str(len(body))
+    return bottle.HTTPResponse(body, **headers)
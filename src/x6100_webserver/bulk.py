@@ -0,0 +1,175 @@
+"""Import/export of band plans and digital modes as JSON or CSV, and batch edits."""
+import csv
+import io
+import json
+
+from . import models
+
+# Items per chunk of streamed JSON arrays
+JSON_CHUNK_ITEMS = 100
+
+BAND_FIELDS = ["id", "name", "start_freq", "stop_freq", "type"]
+DIGITAL_MODE_FIELDS = ["id", "label", "freq", "mode", "type"]
+
+
+def _to_int(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} should be an integer, got {value!r}")
+
+
+def _band_params(value) -> dict[str, int]:
+    """Return band params checked to be integers, as the GUI reads them."""
+    if value in (None, ""):
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"params should be an object, got {value!r}")
+    return {str(name): _to_int(val, f"params.{name}") for name, val in value.items()}
+
+
+def _band_from_dict(data: dict, line: int, where="Row") -> models.BandParams:
+    try:
+        band_id = data.get("id")
+        return models.BandParams(
+            id=None if band_id in (None, "") else _to_int(band_id, "id"),
+            name=str(data["name"]),
+            start_freq=_to_int(data["start_freq"], "start_freq"),
+            stop_freq=_to_int(data["stop_freq"], "stop_freq"),
+            type=_to_int(data.get("type", 1), "type"),
+            params=_band_params(data.get("params")),
+        )
+    except KeyError as e:
+        raise ValueError(f"{where} {line}: {e.args[0]} is required")
+    except ValueError as e:
+        raise ValueError(f"{where} {line}: {e}")
+
+
+def _digital_mode_from_dict(data: dict, line: int, where="Row") -> models.DigitalMode:
+    try:
+        mode_id = data.get("id")
+        return models.DigitalMode(
+            id=None if mode_id in (None, "") else _to_int(mode_id, "id"),
+            label=str(data["label"]),
+            freq=_to_int(data["freq"], "freq"),
+            mode=_to_int(data["mode"], "mode"),
+            type=_to_int(data["type"], "type"),
+        )
+    except KeyError as e:
+        raise ValueError(f"{where} {line}: {e.args[0]} is required")
+    except ValueError as e:
+        raise ValueError(f"{where} {line}: {e}")
+
+
+def _json_items(items) -> list[dict]:
+    if not isinstance(items, list) or not all(isinstance(x, dict) for x in items):
+        raise ValueError("JSON body should be a list of objects")
+    return items
+
+
+def bands_from_json(items) -> list[models.BandParams]:
+    return [_band_from_dict(x, i) for i, x in enumerate(_json_items(items), 1)]
+
+
+def bands_from_csv(text: str) -> list[models.BandParams]:
+    """Parse bands CSV, columns other than BAND_FIELDS are band params."""
+    bands = []
+    for line, row in enumerate(csv.DictReader(io.StringIO(text)), 2):
+        data = {k: v for k, v in row.items() if k in BAND_FIELDS}
+        data["params"] = {
+            k: v
+            for k, v in row.items()
+            if k and k not in BAND_FIELDS and v not in (None, "")
+        }
+        bands.append(_band_from_dict(data, line))
+    return bands
+
+
+def digital_modes_from_json(items) -> list[models.DigitalMode]:
+    return [_digital_mode_from_dict(x, i) for i, x in enumerate(_json_items(items), 1)]
+
+
+def digital_modes_from_csv(text: str) -> list[models.DigitalMode]:
+    reader = csv.DictReader(io.StringIO(text))
+    return [_digital_mode_from_dict(row, line) for line, row in enumerate(reader, 2)]
+
+
+def batch_from_json(data) -> list[models.BatchOp]:
+    """Parse batch body: {"ops": [{"op": ..., "table": ..., "id": ..., "data": {...}}, ...]}.
+
+    id is required by update and delete, data by create and update.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("ops"), list):
+        raise ValueError('JSON body should be an object with "ops" list')
+    if not data["ops"]:
+        raise ValueError("No operations")
+    ops = []
+    for i, item in enumerate(data["ops"], 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Operation {i}: should be an object")
+        action = item.get("op")
+        table = item.get("table")
+        if action not in models.BATCH_ACTIONS:
+            raise ValueError(f"Operation {i}: unknown op {action!r}")
+        if table not in models.BATCH_TABLES:
+            raise ValueError(f"Operation {i}: unknown table {table!r}")
+        row_id = None
+        if action != "create":
+            row_id = _to_int(item.get("id"), f"Operation {i}: id")
+        parsed = None
+        if action != "delete":
+            fields = item.get("data")
+            if not isinstance(fields, dict):
+                raise ValueError(f"Operation {i}: data should be an object")
+            fields = {**fields, "id": row_id}
+            if table == "bands":
+                parsed = _band_from_dict(fields, i, "Operation")
+            else:
+                parsed = _digital_mode_from_dict(fields, i, "Operation")
+        ops.append(models.BatchOp(action, table, row_id, parsed))
+    return ops
+
+
+def iter_json(items):
+    """Yield JSON array in chunks of JSON_CHUNK_ITEMS items.
+
+    Items are consumed one by one, so memory use doesn't depend on their count.
+    """
+    encode = json.JSONEncoder().encode
+    chunk = []
+    sep = "["
+    for item in items:
+        chunk.append(sep + encode(item.asdict()))
+        sep = ",\n"
+        if len(chunk) >= JSON_CHUNK_ITEMS:
+            yield "".join(chunk)
+            chunk.clear()
+    chunk.append("[]" if sep == "[" else "]")
+    yield "".join(chunk)
+
+
+def _csv_line(writer, buf, row):
+    writer.writerow(row)
+    line = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return line
+
+
+def iter_bands_csv(bands: list[models.BandParams]):
+    param_names = sorted({k for b in bands for k in b.params})
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    yield _csv_line(writer, buf, BAND_FIELDS + param_names)
+    for b in bands:
+        row = [b.id, b.name, b.start_freq, b.stop_freq, b.type]
+        row += [b.params.get(k, "") for k in param_names]
+        yield _csv_line(writer, buf, row)
+
+
+def iter_digital_modes_csv(d_modes: list[models.DigitalMode]):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    yield _csv_line(writer, buf, DIGITAL_MODE_FIELDS)
+    for x in d_modes:
+        yield _csv_line(writer, buf, [x.id, x.label, x.freq, x.mode, x.type])
@@ -0,0 +1,108 @@
+"""SQLite connections: opened once per thread and reused between requests."""
+import inspect
+import logging
+import sqlite3
+import threading
+
+import bottle
+
+from . import events
+from . import metrics
+from . import models
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    """Open connection in WAL mode, waiting for locks held by other writers."""
+    con = sqlite3.connect(path or settings.DB_PATH, timeout=settings.DB_BUSY_TIMEOUT,
+                          factory=metrics.Connection)
+    con.row_factory = sqlite3.Row
+    try:
+        con.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError as e:
+        logger.warning("Can't switch database to WAL mode: %s", e)
+    return con
+
+
+def end_transaction():
+    """Invalidate caches of tables changed in just finished transaction and notify clients."""
+    for table in models.end_transaction():
+        events.publish("change", {"table": table, "version": models.data_version(table)[0]})
+
+
+def commit(con: sqlite3.Connection):
+    """Commit transaction made outside of a request."""
+    con.commit()
+    end_transaction()
+
+
+class ConnectionPool:
+    """Connections to a single database, one per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def get(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = connect(self.path)
+            with self._lock:
+                self._connections.append(con)
+        return con
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for con in connections:
+            con.close()
+
+
+class Plugin:
+    """Pass pooled connection to routes with `keyword` argument.
+
+    Transaction is committed when the route returns (or raises HTTPResponse)
+    and rolled back on errors.
+    """
+
+    name = "sqlite"
+    api = 2
+
+    def __init__(self, pool: ConnectionPool, keyword="dbcon"):
+        self.pool = pool
+        self.keyword = keyword
+
+    def setup(self, app):
+        for other in app.plugins:
+            if isinstance(other, Plugin) and other.keyword == self.keyword:
+                raise bottle.PluginError(f"Found another sqlite plugin with keyword {self.keyword}")
+
+    def apply(self, callback, route):
+        if self.keyword not in inspect.signature(route.callback).parameters:
+            return callback
+
+        def wrapper(*args, **kwargs):
+            con = self.pool.get()
+            kwargs[self.keyword] = con
+            try:
+                rv = callback(*args, **kwargs)
+            except bottle.HTTPError:
+                con.rollback()
+                raise
+            except bottle.HTTPResponse:
+                con.commit()
+                raise
+            except Exception:
+                con.rollback()
+                raise
+            else:
+                con.commit()
+                return rv
+            finally:
+                end_transaction()
+
+        return wrapper
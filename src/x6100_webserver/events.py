@@ -0,0 +1,87 @@
+"""Server-Sent Events: pushing server state changes to open pages."""
+import collections
+from datetime import datetime, timezone
+import json
+import threading
+import time
+
+from . import settings
+
+# Events kept for clients reconnecting with Last-Event-ID
+HISTORY_SIZE = 64
+# Server time is sent this often, it also keeps idle connections alive
+TICK_INTERVAL = 15.0
+RETRY_MS = 3000
+
+
+def _frame(event: str, data: str, event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+
+def server_time() -> dict:
+    return {"server_time": datetime.now(timezone.utc).isoformat()}
+
+
+class Broker:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._history = collections.deque(maxlen=HISTORY_SIZE)
+        self._clients = 0
+
+    def publish(self, event: str, data: dict):
+        with self._cond:
+            self._seq += 1
+            self._history.append((self._seq, event, json.dumps(data)))
+            self._cond.notify_all()
+
+    def connect(self) -> bool:
+        """Register new client, return False if there are too many of them.
+
+        Every client holds a server thread, so their count is limited.
+        """
+        with self._cond:
+            if self._clients >= settings.EVENTS_MAX_CLIENTS:
+                return False
+            self._clients += 1
+            return True
+
+    def _disconnect(self):
+        with self._cond:
+            self._clients -= 1
+
+    def _wait(self, last_id: int, timeout: float) -> tuple[list, int]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > last_id, timeout)
+            return [item for item in self._history if item[0] > last_id], self._seq
+
+    def stream(self, last_id: int | None = None):
+        """Yield SSE frames for a client registered with connect().
+
+        Events published after last_id are followed by new ones and the
+        server time ticks. Client is unregistered when the stream is closed.
+        """
+        try:
+            with self._cond:
+                if last_id is None or last_id > self._seq:
+                    last_id = self._seq
+            yield f"retry: {RETRY_MS}\n\n"
+            next_tick = 0.0
+            while True:
+                now = time.monotonic()
+                if now >= next_tick:
+                    yield _frame("time", json.dumps(server_time()))
+                    next_tick = now + TICK_INTERVAL
+                items, last_id = self._wait(last_id, next_tick - now)
+                for event_id, event, data in items:
+                    yield _frame(event, data, event_id)
+        finally:
+            self._disconnect()
+
+
+broker = Broker()
+
+
+def publish(event: str, data: dict):
+    broker.publish(event, data)
@@ -0,0 +1,334 @@
+"""File browser: paths confined to FILEBROWSER_PATH, cached listings and downloads."""
+import collections
+import email.utils
+import io
+import os
+import threading
+import time
+import urllib.parse
+
+import bottle
+
+from . import settings
+
+MAX_PAGE_SIZE = 1000
+CACHE_SIZE = 32
+# Directory mtime has 2 s resolution on FAT, listings of directories
+# changed more recently than that are not cached
+MTIME_RESOLUTION = 2.0
+
+SORT_KEYS = {
+    "name": lambda e: e.name,
+    "size": lambda e: (e.size, e.name),
+    "mtime": lambda e: (e.mtime, e.name),
+}
+
+# Files which are already compressed are stored in ZIP archives as is
+COMPRESSED_EXTENSIONS = {
+    ".7z", ".aac", ".bz2", ".flac", ".gif", ".gz", ".jpeg", ".jpg", ".m4a",
+    ".mp3", ".mp4", ".ogg", ".opus", ".png", ".webp", ".xz", ".zip",
+}
+ZIP_CHUNK_SIZE = 64 * 1024
+
+Entry = collections.namedtuple("Entry", ["name", "is_dir", "size", "mtime"])
+
+
+def resolve(filepath: str) -> str:
+    """Return real path of filepath inside file browser root.
+
+    Raises PermissionError if the path leads outside of the root.
+    """
+    root = os.path.realpath(settings.FILEBROWSER_PATH)
+    path = os.path.realpath(os.path.join(root, filepath.lstrip("/")))
+    if path != root and not path.startswith(root + os.sep):
+        raise PermissionError(f"Access denied: {filepath}")
+    return path
+
+
+def _scan(path: str) -> list[Entry]:
+    entries = []
+    with os.scandir(path) as it:
+        for item in it:
+            try:
+                # is_dir() uses d_type from readdir, stat() is done once per entry
+                is_dir = item.is_dir()
+                st = item.stat()
+            except OSError:
+                continue
+            entries.append(Entry(item.name, is_dir, 0 if is_dir else st.st_size, int(st.st_mtime)))
+    return entries
+
+
+class _Listing:
+    def __init__(self, mtime_ns: int, entries: list[Entry]):
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+        self.sorted = {}
+
+    def get_sorted(self, sort: str, reverse: bool) -> list[Entry]:
+        key = (sort, reverse)
+        result = self.sorted.get(key)
+        if result is None:
+            result = sorted(self.entries, key=SORT_KEYS[sort], reverse=reverse)
+            # Directories always go first
+            result.sort(key=lambda e: not e.is_dir)
+            self.sorted[key] = result
+        return result
+
+
+_cache_lock = threading.Lock()
+_cache: collections.OrderedDict[str, _Listing] = collections.OrderedDict()
+
+
+def _listing(path: str) -> _Listing:
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _cache_lock:
+        listing = _cache.get(path)
+        if listing is not None and listing.mtime_ns == mtime_ns:
+            _cache.move_to_end(path)
+            return listing
+
+    listing = _Listing(mtime_ns, _scan(path))
+    if time.time() - mtime_ns / 1e9 > MTIME_RESOLUTION:
+        with _cache_lock:
+            _cache[path] = listing
+            _cache.move_to_end(path)
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return listing
+
+
+def list_dir(filepath: str, sort="name", order="asc", cursor=None, limit=200) -> dict:
+    """Return page of directory entries, directories first.
+
+    Listing is cached until directory mtime changes, so pages after the
+    first one don't touch the file system except a single stat.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort: {sort}")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Unknown order: {order}")
+    try:
+        start = int(cursor) if cursor else 0
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("cursor and limit should be integers")
+
+    path = resolve(filepath)
+    if not os.path.isdir(path):
+        raise NotADirectoryError(f"Not a directory: {filepath}")
+    entries = _listing(path).get_sorted(sort, order == "desc")
+    page = entries[start:start + limit]
+    end = start + len(page)
+    return {
+        "entries": [
+            {
+                "name": e.name,
+                "type": "dir" if e.is_dir else "file",
+                "size": e.size,
+                "mtime": e.mtime,
+            }
+            for e in page
+        ],
+        "total": len(entries),
+        "next": str(end) if end < len(entries) else None,
+    }
+
+
+class FileRange:
+    """Part of an open file returned as response body.
+
+    Servers may send it with os.sendfile() using fileno(), offset and length,
+    otherwise it is read in chunks like a regular file.
+    """
+
+    def __init__(self, f, offset: int, length: int):
+        self.file = f
+        self.offset = offset
+        self.length = length
+        self._remaining = length
+        f.seek(offset)
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def read(self, size=-1) -> bytes:
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self.file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+_flushed_lock = threading.Lock()
+# Path -> (mtime, size) of the file when it was flushed last time
+_flushed: dict[str, tuple[int, int]] = {}
+
+
+def _flush(f, path: str, st: os.stat_result):
+    """Flush file to storage unless it wasn't changed since the last flush."""
+    key = (st.st_mtime_ns, st.st_size)
+    with _flushed_lock:
+        if _flushed.get(path) == key:
+            return
+    os.fsync(f.fileno())
+    with _flushed_lock:
+        if len(_flushed) >= CACHE_SIZE * 8:
+            _flushed.clear()
+        _flushed[path] = key
+
+
+def _content_disposition(name: str) -> str:
+    fallback = name.encode("ascii", "replace").decode().replace('"', "")
+    quoted = urllib.parse.quote(name, safe="")
+    return f'attachment; filename="{fallback}"; filename*=UTF-8\'\'{quoted}'
+
+
+def send_file(path: str) -> bottle.HTTPResponse:
+    """Return download response for path (already resolved).
+
+    Only this file is flushed to storage. Supports conditional requests
+    (If-None-Match, If-Modified-Since) and a single byte range with If-Range.
+    """
+    import mimetypes
+
+    environ = bottle.request.environ
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return bottle.HTTPError(404, "File does not exist.")
+    except PermissionError:
+        return bottle.HTTPError(403, "You do not have permission to access this file.")
+    try:
+        st = os.fstat(f.fileno())
+        _flush(f, path, st)
+    except OSError:
+        f.close()
+        raise
+
+    size = st.st_size
+    etag = f'"{st.st_ino:x}-{size:x}-{st.st_mtime_ns:x}"'
+    mtime = int(st.st_mtime)
+    mimetype, encoding = mimetypes.guess_type(path)
+    if encoding or not mimetype:
+        mimetype = "application/octet-stream"
+    headers = {
+        "Content-Type": mimetype,
+        "Content-Disposition": _content_disposition(os.path.basename(path)),
+        "Last-Modified": email.utils.formatdate(mtime, usegmt=True),
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+    }
+
+    inm = environ.get("HTTP_IF_NONE_MATCH")
+    ims = bottle.parse_date(environ.get("HTTP_IF_MODIFIED_SINCE", "").split(";")[0].strip())
+    if (inm and etag in (x.strip() for x in inm.split(","))) or (
+        not inm and ims is not None and ims >= mtime
+    ):
+        f.close()
+        return bottle.HTTPResponse(status=304, **headers)
+
+    range_header = environ.get("HTTP_RANGE")
+    if_range = environ.get("HTTP_IF_RANGE")
+    if range_header and if_range and if_range not in (etag, headers["Last-Modified"]):
+        # File was changed since the client got the first part, send it whole
+        range_header = None
+
+    status = 200
+    offset, length = 0, size
+    if range_header:
+        ranges = list(bottle.parse_range_header(range_header, size))
+        if not ranges:
+            f.close()
+            return bottle.HTTPResponse(
+                status=416, **{**headers, "Content-Range": f"bytes */{size}"}
+            )
+        start, end = ranges[0]
+        offset, length = start, end - start
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        status = 206
+    headers["Content-Length"] = str(length)
+
+    if bottle.request.method == "HEAD":
+        f.close()
+        return bottle.HTTPResponse(status=status, **headers)
+    return bottle.HTTPResponse(FileRange(f, offset, length), status=status, **headers)
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable ZIP output, written data is taken by the response iterator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def take(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def _walk_files(path: str, prefix=""):
+    """Yield (archive_name, full_path) of files under path, symlinks are skipped."""
+    try:
+        with os.scandir(path) as it:
+            items = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    for item in items:
+        name = prefix + item.name
+        if item.is_symlink():
+            continue
+        if item.is_dir():
+            yield from _walk_files(item.path, name + "/")
+        elif item.is_file():
+            yield name, item.path
+
+
+def iter_zip(path: str):
+    """Yield ZIP archive of directory at path (already resolved) by chunks.
+
+    Archive is produced on the fly with data descriptors, so memory use
+    doesn't depend on the directory size and no temporary file is needed.
+    """
+    import zipfile
+
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w", strict_timestamps=False) as zf:
+        for name, full_path in _walk_files(path):
+            try:
+                src = open(full_path, "rb")
+            except OSError:
+                continue
+            with src:
+                zinfo = zipfile.ZipInfo.from_file(full_path, name, strict_timestamps=False)
+                if os.path.splitext(name)[1].lower() in COMPRESSED_EXTENSIONS:
+                    zinfo.compress_type = zipfile.ZIP_STORED
+                else:
+                    zinfo.compress_type = zipfile.ZIP_DEFLATED
+                with zf.open(zinfo, "w") as dst:
+                    while chunk := src.read(ZIP_CHUNK_SIZE):
+                        dst.write(chunk)
+                        yield from stream.take()
+            yield from stream.take()
+    yield from stream.take()
+
+
+def send_zip(path: str) -> bottle.HTTPResponse:
+    """Return streaming ZIP download response of directory at path."""
+    name = os.path.basename(path) or "files"
+    headers = {
+        "Content-Type": "application/zip",
+        "Content-Disposition": _content_disposition(name + ".zip"),
+        "Cache-Control": "private, no-store",
+    }
+    return bottle.HTTPResponse(iter_zip(path), **headers)
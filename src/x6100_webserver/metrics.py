@@ -0,0 +1,267 @@
+"""Request, SQL and sync metrics exposed in Prometheus text format."""
+import logging
+import sqlite3
+import threading
+import time
+
+import bottle
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SYNC_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_lock = threading.Lock()
+_metrics = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra="") -> str:
+    items = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if extra:
+        items.append(extra)
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.values = {}
+        _metrics.append(self)
+
+    def inc(self, labels=(), value=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.buckets = buckets
+        # Labels -> [count per bucket..., sum, count]
+        self.values = {}
+        _metrics.append(self)
+
+    def observe(self, labels, value: float):
+        with _lock:
+            item = self.values.get(labels)
+            if item is None:
+                item = self.values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    item[i] += 1
+            item[-2] += value
+            item[-1] += 1
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, item in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, item):
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {count}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {item[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {item[-2]}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {item[-1]}"
+
+
+requests_total = Counter(
+    "x6100_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+request_seconds = Histogram(
+    "x6100_http_request_duration_seconds", "Time spent in route handlers.", ("method", "route")
+)
+response_bytes = Counter(
+    "x6100_http_response_bytes_total", "Response body bytes by route.", ("route",)
+)
+sql_statements = Counter(
+    "x6100_sql_statements_total", "Executed SQL statements by kind.", ("statement",)
+)
+sql_seconds = Counter(
+    "x6100_sql_seconds_total", "Time spent executing SQL statements by kind.", ("statement",)
+)
+sync_jobs = Counter(
+    "x6100_sync_jobs_total", "Wavelog sync jobs by source and result.", ("source", "result")
+)
+sync_seconds = Histogram(
+    "x6100_sync_job_duration_seconds", "Wavelog sync job durations.", ("source",), SYNC_BUCKETS
+)
+sync_records = Counter("x6100_sync_records_total", "QSO records uploaded to Wavelog.")
+sync_bytes = Counter("x6100_sync_bytes_total", "ADIF bytes uploaded to Wavelog.")
+
+
+def render() -> str:
+    with _lock:
+        lines = [line for metric in _metrics for line in metric.collect()]
+    return "\n".join(lines) + "\n"
+
+
+# SQL statistics of the request handled by the current thread
+_request = threading.local()
+
+
+def _observe_sql(sql: str, started: float):
+    elapsed = time.perf_counter() - started
+    kind = (sql.lstrip().split(None, 1) or ["?"])[0].upper()
+    sql_statements.inc((kind,))
+    sql_seconds.inc((kind,), elapsed)
+    _request.sql_count = getattr(_request, "sql_count", 0) + 1
+    _request.sql_time = getattr(_request, "sql_time", 0.0) + elapsed
+
+
+class Cursor(sqlite3.Cursor):
+    """sqlite3 cursor counting statements executed with it."""
+
+    def execute(self, sql, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, *args, **kwargs)
+        finally:
+            _observe_sql(sql, started)
+
+    def executemany(self, sql, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, *args, **kwargs)
+        finally:
+            _observe_sql(sql, started)
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3 connection counting statements executed with it and its cursors.
+
+    Connection.execute() and the commit of `with con:` don't go through
+    cursor() and commit(), so they are counted separately.
+    """
+
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, *args, **kwargs)
+        finally:
+            _observe_sql(sql, started)
+
+    def executemany(self, sql, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, *args, **kwargs)
+        finally:
+            _observe_sql(sql, started)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _observe_sql("COMMIT", started)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            return super().__exit__(exc_type, exc, tb)
+        started = time.perf_counter()
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            _observe_sql("COMMIT", started)
+
+
+def observe_sync_job(source: str, ok: bool, duration: float, records: int, nbytes: int):
+    sync_jobs.inc((source, "ok" if ok else "error"))
+    sync_seconds.observe((source,), duration)
+    sync_records.inc((), records)
+    sync_bytes.inc((), nbytes)
+
+
+class Plugin:
+    """Count requests and their handling time per route.
+
+    Requests slower than settings.SLOW_REQUEST_MS are logged with their
+    SQL statistics.
+    """
+
+    name = "metrics"
+    api = 2
+
+    def apply(self, callback, route):
+        def wrapper(*args, **kwargs):
+            _request.sql_count = 0
+            _request.sql_time = 0.0
+            started = time.perf_counter()
+            status = 500
+            try:
+                rv = callback(*args, **kwargs)
+                if isinstance(rv, bottle.HTTPResponse):
+                    status = rv.status_code
+                else:
+                    status = bottle.response.status_code
+                return rv
+            except bottle.HTTPResponse as e:
+                status = e.status_code
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                requests_total.inc((route.method, route.rule, str(status)))
+                request_seconds.observe((route.method, route.rule), elapsed)
+                if settings.SLOW_REQUEST_MS and elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+                    logger.warning(
+                        "Slow request %s %s: %.1f ms, %d SQL statements (%.1f ms)",
+                        bottle.request.method, bottle.request.path, elapsed * 1000,
+                        _request.sql_count, _request.sql_time * 1000,
+                    )
+
+        return wrapper
+
+
+class _CountingIterable:
+    def __init__(self, result, route: str):
+        self.result = result
+        self.route = route
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self.result:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        response_bytes.inc((self.route,), self.size)
+        if hasattr(self.result, "close"):
+            self.result.close()
+
+
+def count_bytes(app):
+    """Wrap WSGI app to count response bytes per route.
+
+    File wrapper results are passed as is, so servers can still send them
+    with sendfile(); only bodies with known length (FileRange) are counted.
+    """
+    def wrapper(environ, start_response):
+        result = app(environ, start_response)
+        route = environ.get("bottle.route")
+        rule = route.rule if route is not None else "unmatched"
+        filelike = getattr(result, "filelike", None)
+        if filelike is not None:
+            response_bytes.inc((rule,), getattr(filelike, "length", 0))
+            return result
+        return _CountingIterable(result, rule)
+
+    return wrapper
@@ -1,12 +1,102 @@
+import bisect
 import dataclasses
 import sqlite3
+import threading
+import time
+from typing import Iterator
+import weakref
 
 # TODO: enum
 MODE_LSB = 0
 MODE_USB = 2
 
+# Data versions are bumped by every write function and by commits of other
+# processes (see check_external_changes). Epoch makes versions from
+# different server runs distinct.
+VERSION_EPOCH = int(time.time())
 
-@dataclasses.dataclass(kw_only=True, frozen=True)
+_versions_lock = threading.Lock()
+_versions = {
+    "bands": [0, VERSION_EPOCH],
+    "digital_modes": [0, VERSION_EPOCH],
+    "params": [0, VERSION_EPOCH],
+}
+
+
+def data_version(table: str) -> tuple[int, int]:
+    """Return (version, modification timestamp) of table data."""
+    with _versions_lock:
+        version, modified = _versions[table]
+        return version, modified
+
+
+# Tables changed by the current thread in not yet finished transaction
+_touched = threading.local()
+
+
+def _bump(table: str):
+    if table == "bands":
+        _invalidate_bands_cache()
+    elif table == "digital_modes":
+        _invalidate_digital_modes_cache()
+    elif table == "params":
+        _invalidate_params_cache()
+    with _versions_lock:
+        item = _versions[table]
+        item[0] += 1
+        # Keep timestamps strictly increasing, Last-Modified has 1s resolution
+        item[1] = max(int(time.time()), item[1] + 1)
+
+
+def _touch(table: str):
+    _bump(table)
+    tables = getattr(_touched, "tables", None)
+    if tables is None:
+        tables = _touched.tables = set()
+    tables.add(table)
+
+
+def end_transaction() -> set[str]:
+    """Invalidate caches of tables changed in just committed or rolled back transaction.
+
+    Write functions invalidate caches before commit, so other threads may
+    load not yet committed (or old) data into them in between. Returns
+    names of the changed tables.
+    """
+    tables = getattr(_touched, "tables", None)
+    if not tables:
+        return set()
+    _touched.tables = set()
+    for table in tables:
+        _bump(table)
+    return tables
+
+
+# PRAGMA data_version last seen on each connection
+_seen_data_versions = weakref.WeakKeyDictionary()
+
+
+def check_external_changes(con: sqlite3.Connection) -> bool:
+    """Invalidate caches if the database was changed by another connection.
+
+    The GUI writes the same database (e.g. band params on every VFO
+    change), which write functions here don't know about. data_version
+    changes on commits of any other connection and reading it doesn't
+    touch the database file when nothing changed, so it's checked before
+    every cache use. Changed tables aren't known, all of them are bumped,
+    also on the first check of a connection. Returns whether they were.
+    """
+    version = con.execute("PRAGMA data_version").fetchone()[0]
+    with _versions_lock:
+        changed = _seen_data_versions.get(con) != version
+        _seen_data_versions[con] = version
+    if changed:
+        for table in _versions:
+            _bump(table)
+    return changed
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True, slots=True)
 class BandParams:
     name: str
     start_freq: int
@@ -22,50 +112,143 @@ class BandParams:
         if self.start_freq >= self.stop_freq:
             raise ValueError("Stop freq should be greater than start freq")
 
-    def check_overlaps(self, exists: list['BandParams']):
-        for b in exists:
-            if b.start_freq < self.start_freq < b.stop_freq:
-                raise ValueError(
-                    f'Start freq {self.start_freq} overlap with band "{b.name}"'
-                )
-            if b.start_freq < self.stop_freq < b.stop_freq:
-                raise ValueError(
-                    f'Stop freq {self.stop_freq} overlap with band "{b.name}"'
-                )
-            if b.start_freq <= self.start_freq and b.stop_freq >= self.stop_freq:
-                raise ValueError(f'Band "{self.name}" overlap with band "{b.name}"')
-            if b.start_freq >= self.start_freq and b.stop_freq <= self.stop_freq:
-                raise ValueError(f'Band "{self.name}" overlap with band "{b.name}"')
+    def overlaps(self, other: 'BandParams') -> bool:
+        return self.start_freq < other.stop_freq and other.start_freq < self.stop_freq
+
+    def check_overlaps(self, exists: 'BandIndex'):
+        b = exists.find_overlap(self)
+        if b is None:
+            return
+        if b.start_freq < self.start_freq < b.stop_freq:
+            raise ValueError(
+                f'Start freq {self.start_freq} overlap with band "{b.name}"'
+            )
+        if b.start_freq < self.stop_freq < b.stop_freq:
+            raise ValueError(
+                f'Stop freq {self.stop_freq} overlap with band "{b.name}"'
+            )
+        raise ValueError(f'Band "{self.name}" overlap with band "{b.name}"')
 
     def asdict(self):
-        return dataclasses.asdict(self)
+        return {
+            "name": self.name,
+            "start_freq": self.start_freq,
+            "stop_freq": self.stop_freq,
+            "type": self.type,
+            "id": self.id,
+            "params": self.params,
+        }
+
+
+class BandIndex:
+    """Bands sorted by start freq with bisect based lookups.
+
+    Bands in the plan should not overlap, so the running maximum of stop
+    freqs only matters for broken plans and keeps lookups correct for them.
+    """
+
+    def __init__(self, bands: list[BandParams]):
+        self.bands = sorted(bands, key=lambda b: b.start_freq)
+        self.starts = [b.start_freq for b in self.bands]
+        self.max_stops = []
+        max_stop = None
+        for b in self.bands:
+            if max_stop is None or b.stop_freq > max_stop:
+                max_stop = b.stop_freq
+            self.max_stops.append(max_stop)
+        self.by_id = {b.id: b for b in self.bands}
+
+    def __len__(self):
+        return len(self.bands)
+
+    def get(self, band_id) -> BandParams | None:
+        return self.by_id.get(band_id)
+
+    def find(self, freq: int) -> BandParams | None:
+        """Return band containing freq, stop freq is inclusive."""
+        i = bisect.bisect_right(self.starts, freq) - 1
+        while i >= 0 and self.max_stops[i] >= freq:
+            if self.bands[i].stop_freq >= freq:
+                return self.bands[i]
+            i -= 1
+        return None
+
+    def find_overlap(self, band: BandParams) -> BandParams | None:
+        """Return first band overlapping with band, band with the same id is skipped."""
+        i = bisect.bisect_left(self.starts, band.stop_freq) - 1
+        while i >= 0 and self.max_stops[i] > band.start_freq:
+            b = self.bands[i]
+            if b.id != band.id and b.overlaps(band):
+                return b
+            i -= 1
+        return None
+
+
+_bands_lock = threading.Lock()
+_band_index: BandIndex | None = None
+
+
+def _invalidate_bands_cache():
+    global _band_index
+    with _bands_lock:
+        _band_index = None
+
+
+def iter_bands(con: sqlite3.Connection) -> Iterator[BandParams]:
+    """Yield bands ordered by start freq straight from the cursor, see read_band_index."""
+    band = None
+    for row in con.execute(
+        "SELECT b.id, b.name, b.start_freq, b.stop_freq, b.type, p.name, p.val "
+        "FROM bands AS b LEFT JOIN band_params AS p ON p.bands_id = b.id "
+        "ORDER BY b.start_freq, b.id"
+    ):
+        if band is None or band.id != row[0]:
+            if band is not None:
+                yield band
+            band = BandParams(
+                id=row[0], name=row[1], start_freq=row[2], stop_freq=row[3], type=row[4]
+            )
+        if row[5] is not None:
+            band.params[row[5]] = row[6]
+    if band is not None:
+        yield band
+
+
+def read_band_index(con: sqlite3.Connection) -> BandIndex:
+    """Return index of all bands.
+
+    Index is cached for the whole process until one of the band write
+    functions invalidates it or another connection changes the database,
+    so it should be treated as read-only.
+    """
+    global _band_index
+    check_external_changes(con)
+    with _bands_lock:
+        if _band_index is None:
+            _band_index = BandIndex(list(iter_bands(con)))
+        return _band_index
 
 
 def read_bands(con: sqlite3.Connection) -> list[BandParams]:
-    bands_data = []
-    keys = ["id", "name", "start_freq", "stop_freq", "type"]
+    """Return bands ordered by start freq."""
+    return list(read_band_index(con).bands)
+
 
-    for row in con.execute(f"SELECT {','.join(keys)} FROM bands ORDER BY start_freq"):
-        band_data = dict(zip(keys, row))
-        band_data = BandParams(**band_data)
-        bands_data.append(band_data)
-    for item in bands_data:
-        for row in con.execute(
-            f"SELECT name, val FROM band_params WHERE bands_id = ?", (item.id,)
-        ):
-            item.params[row[0]] = row[1]
-    return bands_data
+def find_band(con: sqlite3.Connection, freq: int) -> BandParams | None:
+    return read_band_index(con).find(freq)
 
 
 def update_band(con: sqlite3.Connection, data: BandParams):
-    exists_bands = read_bands(con)
-    band_to_update = next((x for x in exists_bands if x.id == data.id), None)
+    exists_bands = read_band_index(con)
+    band_to_update = exists_bands.get(data.id)
     if not band_to_update:
         raise ValueError(f"Band parameters with id={data.id} not found")
-    else:
-        exists_bands.remove(band_to_update)
     data.check_overlaps(exists_bands)
+    _update_band_row(con, data, band_to_update)
+    _touch("bands")
+
 
+def _update_band_row(con: sqlite3.Connection, data: BandParams, band_to_update: BandParams):
     # Try update
     cur = con.execute(
         "UPDATE bands SET "
@@ -85,16 +268,33 @@ def update_band(con: sqlite3.Connection, data: BandParams):
                 "UPDATE band_params SET val = ? WHERE bands_id = ? AND name = ?",
                 (data.start_freq, data.id, key),
             )
-    if "vfoa_mode" in band_to_update.params:
+    if "vfoa_mode" in band_to_update.params and "vfoa_mode" in data.params:
         cur.execute(
             "UPDATE band_params SET val = ? WHERE bands_id = ? AND name = ?",
             (data.params["vfoa_mode"], data.id, "vfoa_mode"),
         )
 
 
+def _set_default_params(data: BandParams):
+    if 'vfoa_freq' not in data.params:
+        data.params['vfoa_freq'] = data.start_freq
+    if 'vfoa_mode' not in data.params:
+        if data.start_freq < 10_000_000:
+            mode = MODE_LSB
+        else:
+            mode = MODE_USB
+        data.params['vfoa_mode'] = mode
+
+
 def add_band(con: sqlite3.Connection, data: BandParams):
-    exists_bands: list[BandParams] = read_bands(con)
+    exists_bands = read_band_index(con)
     data.check_overlaps(exists_bands)
+    row_id = _insert_band(con, data)
+    _touch("bands")
+    return row_id
+
+
+def _insert_band(con: sqlite3.Connection, data: BandParams) -> int:
     cur = con.execute(
         "INSERT INTO bands (name, start_freq, stop_freq, type) "
         "VALUES (:name, :start_freq, :stop_freq, :type)",
@@ -103,14 +303,7 @@ def add_band(con: sqlite3.Connection, data: BandParams):
     row_id = cur.lastrowid
     if row_id is None:
         raise RuntimeError("Can't create new band")
-    if 'vfoa_freq' not in data.params:
-        data.params['vfoa_freq'] = data.start_freq
-    if 'vfoa_mode' not in data.params:
-        if data.start_freq < 10_000_000:
-            mode = MODE_LSB
-        else:
-            mode = MODE_USB
-        data.params['vfoa_mode'] = mode
+    _set_default_params(data)
 
     cur.executemany(
         "INSERT INTO band_params (bands_id, name, val) "
@@ -119,12 +312,81 @@ def add_band(con: sqlite3.Connection, data: BandParams):
     )
     return row_id
 
+
 def delete_band(con: sqlite3.Connection, band_id):
+    _delete_band_row(con, band_id)
+    _touch("bands")
+
+
+def _delete_band_row(con: sqlite3.Connection, band_id):
     cur = con.execute("DELETE FROM bands WHERE id = ?", (band_id,))
     cur.execute("DELETE FROM band_params WHERE bands_id = ?", (band_id,))
 
 
-@dataclasses.dataclass(kw_only=True, frozen=True)
+def check_plan_overlaps(bands: list[BandParams]):
+    """Check whole band plan with a single sort and sweep pass."""
+    prev = None
+    for b in sorted(bands, key=lambda x: (x.start_freq, x.stop_freq)):
+        if prev is not None and prev.overlaps(b):
+            raise ValueError(f'Band "{b.name}" overlap with band "{prev.name}"')
+        if prev is None or b.stop_freq > prev.stop_freq:
+            prev = b
+
+
+def _assign_ids(items: list, first_id: int, keep_ids: bool) -> list[int]:
+    ids = [x.id if keep_ids else None for x in items]
+    used = [x for x in ids if x is not None]
+    if len(set(used)) != len(used):
+        raise ValueError("Duplicate ids in imported data")
+    next_id = max(used, default=first_id - 1) + 1
+    next_id = max(next_id, first_id)
+    for i, row_id in enumerate(ids):
+        if row_id is None:
+            ids[i] = next_id
+            next_id += 1
+    return ids
+
+
+def import_bands(con: sqlite3.Connection, bands: list[BandParams], replace=True) -> int:
+    """Write band plan in a single transaction.
+
+    With replace all existing bands are removed and ids from the plan are
+    kept, otherwise bands are appended with new ids.
+    """
+    if replace:
+        check_plan_overlaps(bands)
+        first_id = 1
+    else:
+        exists_bands = read_bands(con)
+        check_plan_overlaps(exists_bands + bands)
+        first_id = max((b.id for b in exists_bands), default=0) + 1
+    ids = _assign_ids(bands, first_id, keep_ids=replace)
+
+    band_rows = []
+    param_rows = []
+    for row_id, data in zip(ids, bands):
+        _set_default_params(data)
+        band_rows.append((row_id, data.name, data.start_freq, data.stop_freq, data.type))
+        param_rows.extend((row_id, k, v) for k, v in data.params.items())
+
+    with con:
+        if replace:
+            con.execute("DELETE FROM band_params")
+            con.execute("DELETE FROM bands")
+        con.executemany(
+            "INSERT INTO bands (id, name, start_freq, stop_freq, type) "
+            "VALUES (?, ?, ?, ?, ?)",
+            band_rows,
+        )
+        con.executemany(
+            "INSERT INTO band_params (bands_id, name, val) VALUES (?, ?, ?)",
+            param_rows,
+        )
+    _touch("bands")
+    return len(band_rows)
+
+
+@dataclasses.dataclass(kw_only=True, frozen=True, slots=True)
 class DigitalMode:
     label: str
     freq: int
@@ -133,19 +395,120 @@ class DigitalMode:
     id: int | None = None
 
     def asdict(self):
-        return dataclasses.asdict(self)
+        return {
+            "label": self.label,
+            "freq": self.freq,
+            "mode": self.mode,
+            "type": self.type,
+            "id": self.id,
+        }
+
+
+class DigitalModeIndex:
+    """Digital modes sorted by freq with bisect based lookups.
+
+    Modes with the same label (e.g. all FT8 dial freqs) have their own
+    index, see select().
+    """
+
+    def __init__(self, d_modes: list[DigitalMode], by_label=True):
+        self.modes = sorted(d_modes, key=lambda x: (x.freq, x.id or 0))
+        self.freqs = [x.freq for x in self.modes]
+        self.labels = {}
+        self.by_id = {}
+        if by_label:
+            self.by_id = {x.id: x for x in self.modes}
+            groups = {}
+            for x in self.modes:
+                groups.setdefault(x.label.lower(), []).append(x)
+            self.labels = {k: DigitalModeIndex(v, by_label=False) for k, v in groups.items()}
+
+    def __len__(self):
+        return len(self.modes)
+
+    def get(self, mode_id) -> DigitalMode | None:
+        """Return mode by id, only the index of all modes has them."""
+        return self.by_id.get(mode_id)
+
+    def select(self, label: str | None) -> 'DigitalModeIndex':
+        """Return index of modes with label (case insensitive), all modes if label is empty."""
+        if not label:
+            return self
+        return self.labels.get(label.lower()) or DigitalModeIndex([], by_label=False)
+
+    def in_range(self, start: int, stop: int) -> list[DigitalMode]:
+        """Return modes with start <= freq <= stop."""
+        i = bisect.bisect_left(self.freqs, start)
+        j = bisect.bisect_right(self.freqs, stop)
+        return self.modes[i:j]
+
+    def nearest(self, freq: int, count: int) -> list[DigitalMode]:
+        """Return up to count modes closest to freq, nearest first."""
+        result = []
+        right = bisect.bisect_left(self.freqs, freq)
+        left = right - 1
+        while len(result) < count and (left >= 0 or right < len(self.modes)):
+            if right >= len(self.modes) or (
+                left >= 0 and freq - self.freqs[left] <= self.freqs[right] - freq
+            ):
+                result.append(self.modes[left])
+                left -= 1
+            else:
+                result.append(self.modes[right])
+                right += 1
+        return result
+
+    def next(self, freq: int) -> DigitalMode | None:
+        """Return first mode above freq."""
+        i = bisect.bisect_right(self.freqs, freq)
+        return self.modes[i] if i < len(self.modes) else None
+
+    def prev(self, freq: int) -> DigitalMode | None:
+        """Return last mode below freq."""
+        i = bisect.bisect_left(self.freqs, freq)
+        return self.modes[i - 1] if i > 0 else None
+
+
+_d_modes_lock = threading.Lock()
+_d_modes_index: DigitalModeIndex | None = None
+
+
+def _invalidate_digital_modes_cache():
+    global _d_modes_index
+    with _d_modes_lock:
+        _d_modes_index = None
+
+
+def read_digital_mode_index(con: sqlite3.Connection) -> DigitalModeIndex:
+    """Return cached index of all digital modes, see read_band_index."""
+    global _d_modes_index
+    check_external_changes(con)
+    with _d_modes_lock:
+        if _d_modes_index is None:
+            _d_modes_index = DigitalModeIndex(list(iter_digital_modes(con)))
+        return _d_modes_index
+
+
+def iter_digital_modes(con: sqlite3.Connection) -> Iterator[DigitalMode]:
+    """Yield digital modes ordered by freq straight from the cursor, see read_digital_mode_index."""
+    for row in con.execute(
+        "SELECT id, label, freq, mode, type FROM digital_modes ORDER BY freq, id"
+    ):
+        yield DigitalMode(id=row[0], label=row[1], freq=row[2], mode=row[3], type=row[4])
+
 
 def read_digital_modes(con: sqlite3.Connection):
-    keys = ["id", "label", "freq", "mode", "type"]
-    d_modes = []
-    for row in con.execute(f"SELECT {','.join(keys)} FROM digital_modes ORDER BY freq ASC"):
-        d_mode = dict(zip(keys, row))
-        d_mode = DigitalMode(**d_mode)
-        d_modes.append(d_mode)
-    return d_modes
+    """Return digital modes ordered by freq."""
+    return list(read_digital_mode_index(con).modes)
 
 
 def add_digital_mode(con: sqlite3.Connection, data: DigitalMode):
+    row_id = _insert_digital_mode(con, data)
+    _touch("digital_modes")
+    return row_id
+
+
+def _insert_digital_mode(con: sqlite3.Connection, data: DigitalMode) -> int:
     cur = con.execute(
         "INSERT INTO digital_modes (label, freq, mode, type) "
         "VALUES (:label, :freq, :mode, :type)",
@@ -158,6 +521,11 @@ def add_digital_mode(con: sqlite3.Connection, data: DigitalMode):
 
 
 def update_digital_mode(con: sqlite3.Connection, data: DigitalMode):
+    _update_digital_mode_row(con, data)
+    _touch("digital_modes")
+
+
+def _update_digital_mode_row(con: sqlite3.Connection, data: DigitalMode):
     # Try update
     cur = con.execute(
         "UPDATE digital_modes SET "
@@ -171,3 +539,164 @@ def update_digital_mode(con: sqlite3.Connection, data: DigitalMode):
 
 def delete_digital_mode(con: sqlite3.Connection, mode_id):
     cur = con.execute("DELETE FROM digital_modes WHERE id = ?", (mode_id,))
+    _touch("digital_modes")
+
+
+def import_digital_modes(
+    con: sqlite3.Connection, d_modes: list[DigitalMode], replace=True
+) -> int:
+    """Write digital modes in a single transaction, see import_bands."""
+    if replace:
+        first_id = 1
+    else:
+        row = con.execute("SELECT MAX(id) FROM digital_modes").fetchone()
+        first_id = (row[0] or 0) + 1
+    ids = _assign_ids(d_modes, first_id, keep_ids=replace)
+    with con:
+        if replace:
+            con.execute("DELETE FROM digital_modes")
+        con.executemany(
+            "INSERT INTO digital_modes (id, label, freq, mode, type) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(row_id, x.label, x.freq, x.mode, x.type) for row_id, x in zip(ids, d_modes)],
+        )
+    _touch("digital_modes")
+    return len(ids)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class BatchOp:
+    """Create, update or delete of a band or digital mode, see apply_batch()."""
+    action: str
+    table: str
+    id: int | None = None
+    item: BandParams | DigitalMode | None = None
+
+
+BATCH_ACTIONS = ("create", "update", "delete")
+BATCH_TABLES = ("bands", "digital_modes")
+
+
+def apply_batch(con: sqlite3.Connection, ops: list[BatchOp]) -> list[int]:
+    """Apply operations in a single transaction, all of them or none.
+
+    Operations are validated together against a snapshot of the tables read
+    under the write lock: created and updated bands are checked for overlaps
+    with the band plan they result in. Returns ids of the rows created,
+    updated or deleted by ops. Raises ValueError naming the first invalid
+    operation.
+    """
+    tables = {op.table for op in ops}
+    with con:
+        if not con.in_transaction:
+            # Take the write lock before reading the snapshot
+            con.execute("BEGIN IMMEDIATE")
+        bands = {b.id: b for b in iter_bands(con)} if "bands" in tables else {}
+        mode_ids = set()
+        if "digital_modes" in tables:
+            mode_ids = {row[0] for row in con.execute("SELECT id FROM digital_modes")}
+
+        plan = dict(bands)
+        changed = []
+        for i, op in enumerate(ops, 1):
+            exists = plan if op.table == "bands" else mode_ids
+            # Negative ids are taken by new bands in the plan
+            if op.action != "create" and (op.id not in exists or op.id < 0):
+                kind = "Band" if op.table == "bands" else "Digital mode"
+                raise ValueError(f"Operation {i}: {kind} with id={op.id} not found")
+            if op.table != "bands":
+                if op.action == "delete":
+                    mode_ids.discard(op.id)
+                continue
+            if op.action == "delete":
+                del plan[op.id]
+                continue
+            # New bands get temporary negative ids to be told apart in the index
+            band = op.item if op.action == "update" else dataclasses.replace(op.item, id=-i)
+            plan[band.id] = band
+            changed.append((i, band))
+        if changed:
+            index = BandIndex(list(plan.values()))
+            for i, band in changed:
+                # Band may be changed again by a later operation
+                if plan.get(band.id) is not band:
+                    continue
+                try:
+                    band.check_overlaps(index)
+                except ValueError as e:
+                    raise ValueError(f"Operation {i}: {e}")
+
+        ids = []
+        for op in ops:
+            if op.table == "bands":
+                if op.action == "create":
+                    ids.append(_insert_band(con, op.item))
+                    continue
+                if op.action == "update":
+                    _update_band_row(con, op.item, bands[op.id])
+                else:
+                    _delete_band_row(con, op.id)
+            elif op.action == "create":
+                ids.append(_insert_digital_mode(con, op.item))
+                continue
+            elif op.action == "update":
+                _update_digital_mode_row(con, op.item)
+            else:
+                con.execute("DELETE FROM digital_modes WHERE id = ?", (op.id,))
+            ids.append(op.id)
+    for table in tables:
+        _touch(table)
+    return ids
+
+
+# Params of the web server, other rows of params table belong to the GUI
+SERVER_PARAMS = (
+    "sync_key",
+    "sync_endpoint",
+    "sync_delay",
+    "sync_station_profile_id",
+    "sync_watch",
+    "sync_timestamp",
+    "sync_log_offset",
+    "qso_log_offset",
+)
+
+_params_lock = threading.Lock()
+_params: dict[str, str] | None = None
+
+
+def _invalidate_params_cache():
+    global _params
+    with _params_lock:
+        _params = None
+
+
+def read_params(con: sqlite3.Connection) -> dict[str, str]:
+    """Return stored server params (see SERVER_PARAMS).
+
+    All of them are loaded with one query and cached until save_params()
+    or a change made by another connection.
+    """
+    global _params
+    check_external_changes(con)
+    with _params_lock:
+        if _params is None:
+            placeholders = ", ".join("?" * len(SERVER_PARAMS))
+            _params = {
+                row[0]: row[1]
+                for row in con.execute(
+                    f"SELECT name, val FROM params WHERE name IN ({placeholders})",
+                    SERVER_PARAMS,
+                )
+            }
+        return dict(_params)
+
+
+def save_params(con: sqlite3.Connection, values: dict):
+    """Insert or update params in the current transaction."""
+    con.executemany(
+        "INSERT INTO params (name, val) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET val = excluded.val",
+        values.items(),
+    )
+    _touch("params")
@@ -0,0 +1,190 @@
+"""SNTP (RFC 4330) client querying several servers at once."""
+import concurrent.futures
+import os
+import select
+import socket
+import struct
+import time
+
+NTP_PORT = 123
+# Seconds between 1900-01-01 (NTP era) and 1970-01-01
+NTP_DELTA = 2208988800
+
+_PACKET = struct.Struct("!BBbb11I")
+_TIMESTAMP = struct.Struct("!II")
+
+
+class NtpError(Exception):
+    pass
+
+
+def _from_ntp(data: bytes) -> float:
+    sec, frac = _TIMESTAMP.unpack(data)
+    return sec - NTP_DELTA + frac / 2**32
+
+
+def split_address(server: str) -> tuple[str, int]:
+    """Split "host", "host:port" or "[ipv6]:port" into host and port."""
+    if server.startswith("["):
+        host, _, port = server[1:].partition("]")
+        port = port.lstrip(":")
+    elif server.count(":") == 1:
+        host, port = server.split(":")
+    else:
+        host, port = server, ""
+    if not host:
+        raise NtpError(f"Invalid NTP server: {server}")
+    try:
+        return host, int(port) if port else NTP_PORT
+    except ValueError:
+        raise NtpError(f"Invalid NTP server: {server}")
+
+
+def _resolve(servers: list[str], max_addresses: int, timeout: float, errors: dict) -> list:
+    """Return (server, sockaddr, family) for addresses of all servers."""
+    def resolve(server):
+        host, port = split_address(server)
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)
+        seen = []
+        for family, _, _, _, sockaddr in infos:
+            if (family, sockaddr) not in seen:
+                seen.append((family, sockaddr))
+        return seen[:max_addresses]
+
+    result = []
+    executor = concurrent.futures.ThreadPoolExecutor(len(servers) or 1, thread_name_prefix="ntp-dns")
+    futures = {executor.submit(resolve, server): server for server in servers}
+    done, not_done = concurrent.futures.wait(futures, timeout)
+    executor.shutdown(wait=False)
+    for future in not_done:
+        errors[futures[future]] = "DNS timeout"
+    for future in done:
+        server = futures[future]
+        try:
+            for family, sockaddr in future.result():
+                result.append((server, sockaddr, family))
+        except (OSError, NtpError) as e:
+            errors[server] = str(e)
+    return result
+
+
+def _parse_reply(data: bytes, sent: bytes, t1: float, t4: float) -> dict:
+    if len(data) < _PACKET.size:
+        raise NtpError("Short reply")
+    fields = _PACKET.unpack_from(data)
+    li, mode = fields[0] >> 6, fields[0] & 0x7
+    stratum = fields[1]
+    if mode != 4:
+        raise NtpError(f"Unexpected mode {mode}")
+    if data[24:32] != sent:
+        raise NtpError("Reply doesn't match request")
+    if stratum == 0:
+        raise NtpError("Kiss-o'-Death: " + data[12:16].decode("ascii", "replace"))
+    if li == 3 or stratum > 15:
+        raise NtpError("Server is not synchronized")
+    t2 = _from_ntp(data[32:40])
+    t3 = _from_ntp(data[40:48])
+    return {
+        "offset": ((t2 - t1) + (t3 - t4)) / 2,
+        "delay": (t4 - t1) - (t3 - t2),
+        "stratum": stratum,
+    }
+
+
+def query(servers: list[str], deadline: float = 1.0, max_addresses: int = 4) -> tuple[list, dict]:
+    """Query all addresses of servers in parallel.
+
+    Returns samples (dicts with server, address, offset, delay and stratum)
+    received before deadline seconds passed and errors by server or address.
+    """
+    start = time.monotonic()
+    errors = {}
+    targets = _resolve(servers, max_addresses, deadline, errors)
+
+    sockets = {}
+    pending = {}
+    for server, sockaddr, family in targets:
+        sock = sockets.get(family)
+        if sock is None:
+            sock = sockets[family] = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+        # Random transmit timestamp identifies reply to the request
+        sent = os.urandom(8)
+        packet = bytes([0x23]) + bytes(39) + sent
+        t1 = time.time()
+        try:
+            sock.sendto(packet, sockaddr)
+        except OSError as e:
+            errors[f"{server} ({sockaddr[0]})"] = str(e)
+            continue
+        pending[(sockaddr[0], sockaddr[1])] = (server, sent, t1, time.monotonic())
+
+    samples = []
+    try:
+        while pending:
+            timeout = deadline - (time.monotonic() - start)
+            if timeout <= 0:
+                break
+            readable, _, _ = select.select(list(sockets.values()), [], [], timeout)
+            for sock in readable:
+                try:
+                    data, sockaddr = sock.recvfrom(512)
+                except OSError:
+                    continue
+                received = time.monotonic()
+                key = (sockaddr[0], sockaddr[1])
+                if key not in pending:
+                    continue
+                server, sent, t1, sent_at = pending.pop(key)
+                # Measure round trip with monotonic clock, wall clock may be stepped
+                t4 = t1 + (received - sent_at)
+                try:
+                    sample = _parse_reply(data, sent, t1, t4)
+                except NtpError as e:
+                    errors[f"{server} ({key[0]})"] = str(e)
+                    continue
+                samples.append({"server": server, "address": key[0], **sample})
+    finally:
+        for sock in sockets.values():
+            sock.close()
+    for (address, _), (server, *_) in pending.items():
+        errors[f"{server} ({address})"] = "Timeout"
+    return samples, errors
+
+
+def set_clock(timestamp: float):
+    """Set system clock to timestamp (seconds since the epoch)."""
+    time.clock_settime_ns(time.CLOCK_REALTIME, int(timestamp * 1e9))
+
+
+def step_clock(offset: float):
+    """Step system clock by offset seconds."""
+    now = time.clock_gettime_ns(time.CLOCK_REALTIME)
+    time.clock_settime_ns(time.CLOCK_REALTIME, now + int(offset * 1e9))
+
+
+def sync_time(servers: list[str], deadline: float = 1.0, apply: bool = True) -> dict:
+    """Query servers and step the clock by offset of the best sample.
+
+    The sample with the lowest round trip delay is used. Raises NtpError if
+    no server replied.
+    """
+    started = time.monotonic()
+    samples, errors = query(servers, deadline)
+    if not samples:
+        details = "; ".join(f"{k}: {v}" for k, v in errors.items())
+        raise NtpError(f"No valid NTP replies ({details})" if details else "No valid NTP replies")
+    best = min(samples, key=lambda s: s["delay"])
+    if apply:
+        step_clock(best["offset"])
+    return {
+        "server": best["server"],
+        "address": best["address"],
+        "offset": best["offset"],
+        "delay": best["delay"],
+        "stratum": best["stratum"],
+        "applied": apply,
+        "samples": samples,
+        "errors": errors,
+        "duration": time.monotonic() - started,
+    }
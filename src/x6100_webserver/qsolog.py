@@ -0,0 +1,157 @@
+"""Indexed QSO store built incrementally from the ADIF log."""
+from datetime import date, timedelta
+import decimal
+import os
+import sqlite3
+
+from . import adif
+from . import db
+from . import models
+from . import settings
+from . import sync
+
+INGEST_CHUNK = 500
+MAX_PAGE_SIZE = 500
+
+_COLUMNS = ["id", "call", "band", "mode", "freq", "ts", "grid"]
+
+
+def ensure_table(con: sqlite3.Connection):
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS qsos ("
+        "id INTEGER PRIMARY KEY, "
+        "call TEXT NOT NULL, "
+        "band TEXT NOT NULL, "
+        "mode TEXT NOT NULL, "
+        "freq INTEGER, "
+        "ts TEXT NOT NULL, "
+        "grid TEXT, "
+        "UNIQUE (call, ts, band, mode))"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS qsos_ts ON qsos (ts, id)")
+    con.execute("CREATE INDEX IF NOT EXISTS qsos_band ON qsos (band, ts, id)")
+    con.execute("CREATE INDEX IF NOT EXISTS qsos_mode ON qsos (mode, ts, id)")
+
+
+def _freq_hz(value: str) -> int | None:
+    try:
+        return int(decimal.Decimal(value) * 1_000_000)
+    except (decimal.InvalidOperation, ValueError):
+        return None
+
+
+def qso_from_fields(fields: dict) -> tuple | None:
+    """Return (call, band, mode, freq, ts, grid) row or None for incomplete record."""
+    call = fields.get("call", "").upper()
+    qso_date = fields.get("qso_date", "")
+    time_on = fields.get("time_on", "").ljust(6, "0")
+    if not call or len(qso_date) != 8 or not (qso_date + time_on).isdigit():
+        return None
+    ts = (
+        f"{qso_date[:4]}-{qso_date[4:6]}-{qso_date[6:]} "
+        f"{time_on[:2]}:{time_on[2:4]}:{time_on[4:6]}"
+    )
+    return (
+        call,
+        fields.get("band", "").lower(),
+        (fields.get("submode") or fields.get("mode", "")).upper(),
+        _freq_hz(fields.get("freq", "")),
+        ts,
+        fields.get("gridsquare", "").upper() or None,
+    )
+
+
+def ingest(con: sqlite3.Connection, path: str | None = None) -> int:
+    """Add records appended to the log since last call, return added count.
+
+    Progress is kept as byte offset in params table, so only the new tail of
+    the log is parsed. Already stored QSOs are ignored.
+    """
+    path = path or settings.ADI_LOG_PATH
+    ensure_table(con)
+    offset = sync.to_int(models.read_params(con).get("qso_log_offset"))
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return 0
+    if size < offset:
+        # Log was replaced, start over, known QSOs are skipped anyway
+        offset = 0
+    if size == offset:
+        return 0
+
+    count = 0
+    with open(path, "rb") as f:
+        chunks = adif.iter_batches(adif.iter_records(f, offset), INGEST_CHUNK, 1 << 20)
+        for chunk in chunks:
+            rows = [qso_from_fields(adif.parse_record(r)) for r, _ in chunk]
+            cur = con.executemany(
+                "INSERT OR IGNORE INTO qsos (call, band, mode, freq, ts, grid) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [x for x in rows if x is not None],
+            )
+            count += cur.rowcount
+            models.save_params(con, {"qso_log_offset": chunk[-1][1]})
+            db.commit(con)
+    return count
+
+
+def _parse_date(value: str, name: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} should be a date in YYYY-MM-DD format")
+
+
+def query(
+    con: sqlite3.Connection,
+    call=None, band=None, mode=None, date_from=None, date_to=None,
+    cursor=None, limit=50,
+) -> tuple[list[dict], str | None]:
+    """Return page of QSOs (newest first) and cursor of the next page.
+
+    call matches prefix of the callsign. Pagination is keyset based, so
+    every page costs the same regardless of its position in the log.
+    """
+    where = []
+    args = []
+    if call:
+        # GLOB is case sensitive and can use the unique (call, ...) index
+        prefix = "".join(c for c in call.upper() if c not in "*?[]")
+        where.append("call GLOB ?")
+        args.append(prefix + "*")
+    if band:
+        where.append("band = ?")
+        args.append(band.lower())
+    if mode:
+        where.append("mode = ?")
+        args.append(mode.upper())
+    if date_from:
+        where.append("ts >= ?")
+        args.append(_parse_date(date_from, "from").isoformat())
+    if date_to:
+        where.append("ts < ?")
+        args.append((_parse_date(date_to, "to") + timedelta(days=1)).isoformat())
+    if cursor:
+        ts, sep, last_id = cursor.rpartition("|")
+        if not sep or not last_id.isdigit():
+            raise ValueError("Invalid cursor")
+        where.append("(ts, id) < (?, ?)")
+        args += [ts, int(last_id)]
+    try:
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit should be an integer")
+
+    sql = f"SELECT {', '.join(_COLUMNS)} FROM qsos"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+    rows = con.execute(sql, args + [limit + 1]).fetchall()
+
+    items = [dict(zip(_COLUMNS, row)) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = f"{last['ts']}|{last['id']}"
+    return items, next_cursor
@@ -0,0 +1,117 @@
+"""Thread pool WSGI server based on wsgiref."""
+import concurrent.futures
+import functools
+import logging
+import socket
+import threading
+import time
+import wsgiref.simple_server
+
+import bottle
+
+from . import START_TIME
+
+logger = logging.getLogger(__name__)
+
+
+class PoolWSGIServer(wsgiref.simple_server.WSGIServer):
+    """Handle requests in a bounded pool of threads.
+
+    When all workers are busy new connections wait in the listen backlog.
+    """
+
+    request_queue_size = 64
+    quiet = False
+
+    def __init__(self, *args, workers=8, **kwargs):
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="http")
+        super().__init__(*args, **kwargs)
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
+class _ServerHandler(wsgiref.simple_server.ServerHandler):
+    def sendfile(self):
+        # Bodies with file, offset and length (e.g. filebrowser.FileRange)
+        # are sent by the kernel without copying to user space
+        body = self.result.filelike
+        f = getattr(body, "file", None)
+        offset = getattr(body, "offset", None)
+        length = getattr(body, "length", None)
+        if f is None or offset is None or length is None:
+            return False
+        if not self.headers_sent:
+            self.send_headers()
+        self._flush()
+        if length > 0:
+            self.bytes_sent += self.request_handler.connection.sendfile(f, offset, length)
+        return True
+
+
+class _RequestHandler(wsgiref.simple_server.WSGIRequestHandler):
+    # Don't let idle clients hold workers forever
+    timeout = 60
+
+    def handle(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+
+        if not self.parse_request():
+            return
+
+        handler = _ServerHandler(
+            self.rfile, self.wfile, self.get_stderr(), self.get_environ(),
+            multithread=True,
+        )
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class PoolServer(bottle.ServerAdapter):
+    """Bottle adapter for PoolWSGIServer, `workers` option sets pool size."""
+
+    def run(self, app):
+        server_class = PoolWSGIServer
+        if ":" in self.host:
+            server_class = type("PoolWSGIServer6", (PoolWSGIServer,), {"address_family": socket.AF_INET6})
+        srv = wsgiref.simple_server.make_server(
+            self.host, self.port, app,
+            server_class=functools.partial(server_class, workers=self.options.get("workers", 8)),
+            handler_class=_RequestHandler,
+        )
+        srv.quiet = self.quiet
+        self.srv = srv
+        self.port = srv.server_port
+        logger.info(
+            "Listening on %s:%d, started in %.2f s",
+            self.host, self.port, time.monotonic() - START_TIME,
+        )
+        try:
+            srv.serve_forever()
+        finally:
+            srv.server_close()
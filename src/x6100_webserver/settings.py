@@ -1,3 +1,30 @@
-
 FILEBROWSER_PATH = ""
 DB_PATH = ""
+ADI_LOG_PATH = "/mnt/ft_log.adi"
+
+# Seconds to wait for database locks held by other writers (e.g. the GUI)
+DB_BUSY_TIMEOUT = 5.0
+# Request handling threads of the pool server
+HTTP_WORKERS = 8
+# Open /api/events streams, each of them holds a request handling thread
+EVENTS_MAX_CLIENTS = 4
+# Requests taking longer are logged with their SQL statistics, 0 disables
+SLOW_REQUEST_MS = 0
+
+# Seconds to wait for NTP replies, the best one received by then is used
+NTP_DEADLINE = 1.0
+
+# Seconds after startup before the first Wavelog upload
+SYNC_STARTUP_DELAY = 30.0
+# Wavelog upload batch limits
+SYNC_BATCH_RECORDS = 100
+SYNC_BATCH_BYTES = 256 * 1024
+# Records refused by Wavelog this many times are dropped from upload spool
+SYNC_SPOOL_MAX_ATTEMPTS = 5
+SYNC_CONNECT_TIMEOUT = 10.0
+SYNC_READ_TIMEOUT = 30.0
+
+# Log watch: upload after this many seconds without writes to the log,
+# but no later than max wait seconds after the first write
+SYNC_WATCH_DEBOUNCE = 2.0
+SYNC_WATCH_MAX_WAIT = 10.0
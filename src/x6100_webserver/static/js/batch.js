@@ -0,0 +1,67 @@
+// Queue of editor changes saved with a single /api/batch request.
+// Changes are keyed by table rows (tr elements): saving a row again
+// replaces its queued change, removing a new row drops it from the queue.
+// onChange is called with the number of queued changes.
+function BatchQueue(table, onChange) {
+  this.table = table;
+  this.onChange = onChange;
+  this.changes = new Map();
+  // Data version after our last batch, to skip our own change events
+  this.version = 0;
+}
+
+BatchQueue.prototype.size = function () {
+  return this.changes.size;
+};
+
+BatchQueue.prototype.has = function (row) {
+  return this.changes.has(row);
+};
+
+BatchQueue.prototype.save = function (row, id, data) {
+  this.changes.set(row, id === null ? {op: "create", data: data} : {op: "update", id: id, data: data});
+  this.onChange(this.size());
+};
+
+BatchQueue.prototype.remove = function (row, id) {
+  if (id === null) {
+    this.changes.delete(row);
+  } else {
+    this.changes.set(row, {op: "delete", id: id});
+  }
+  this.onChange(this.size());
+};
+
+BatchQueue.prototype.clear = function () {
+  this.changes.clear();
+  this.onChange(0);
+};
+
+BatchQueue.prototype.isOwnChange = function (version) {
+  return version <= this.version;
+};
+
+// Send queued changes. done(row, result) is called for every change with
+// its result (op, id and row data unless deleted), all of them are
+// applied or none.
+BatchQueue.prototype.submit = function (done, fail) {
+  const self = this;
+  const rows = Array.from(this.changes.keys());
+  const ops = rows.map((row) => Object.assign({table: self.table}, self.changes.get(row)));
+  $.ajax({
+    url: "/api/batch",
+    type: "POST",
+    data: JSON.stringify({ops: ops}),
+    contentType: "application/json; charset=utf-8",
+    dataType: "json",
+    success: function (response) {
+      self.version = response.version[self.table];
+      self.changes.clear();
+      response.results.forEach((result, i) => done(rows[i], result));
+      self.onChange(0);
+    },
+    error: function (xhr) {
+      if (fail) fail(xhr.responseJSON ? xhr.responseJSON.msg : xhr.statusText);
+    },
+  });
+};
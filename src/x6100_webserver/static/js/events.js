@@ -0,0 +1,22 @@
+// Subscribe to server events from /api/events.
+// handlers maps event names to functions receiving parsed data.
+// fallback is called when the browser or server can't keep the stream
+// open, so the page may poll instead.
+function subscribeEvents(handlers, fallback) {
+  if (!window.EventSource) {
+    if (fallback) fallback();
+    return null;
+  }
+  const source = new EventSource("/api/events");
+  for (const name in handlers) {
+    source.addEventListener(name, function (e) {
+      handlers[name](JSON.parse(e.data));
+    });
+  }
+  source.onerror = function () {
+    if (source.readyState === EventSource.CLOSED && fallback) {
+      fallback();
+    }
+  };
+  return source;
+}
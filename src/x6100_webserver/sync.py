@@ -0,0 +1,472 @@
+"""Wavelog log upload and the background worker running it."""
+from datetime import datetime
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from . import adif
+from . import db
+from . import events
+from . import metrics
+from . import models
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+# Delay before retrying a failed automatic upload, doubled on every failure
+RETRY_MIN_DELAY = 60
+RETRY_MAX_DELAY = 3600
+
+CONFIG_PARAMS = {
+    "key": "sync_key",
+    "endpoint": "sync_endpoint",
+    "delay": "sync_delay",
+    "station_profile_id": "sync_station_profile_id",
+    "watch": "sync_watch",
+}
+
+
+# Spool record states
+SPOOL_PENDING = 0
+SPOOL_SENT = 1
+SPOOL_REJECTED = 2
+
+# Records parsed from the log per spool transaction
+SPOOL_CHUNK = 500
+
+# HTTP statuses meaning the server has refused the uploaded records
+# themselves, unlike auth, endpoint or server errors which would refuse
+# any of them
+CONTENT_ERRORS = (400, 413, 422)
+
+
+class SyncError(Exception):
+    def __init__(self, msg, rejected=False):
+        super().__init__(msg)
+        # Server has refused the data itself, not a connection/server problem
+        self.rejected = rejected
+
+
+def to_int(val, default=0) -> int:
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return default
+
+
+def read_config(con: sqlite3.Connection) -> dict:
+    params = models.read_params(con)
+    return {field: params[name] for field, name in CONFIG_PARAMS.items() if name in params}
+
+
+def upload_batch(config: dict, records: list[str]):
+    """Upload ADIF records, raise SyncError on failure."""
+    # http.client and ssl are slow to import, load them with the first upload
+    from . import uploader
+
+    payload = {
+        "key": config["key"],
+        "station_profile_id": config["station_profile_id"],
+        "type": "adif",
+        "string": "\n".join(records),
+    }
+    try:
+        client = uploader.get_client(config['endpoint'])
+        resp = client.post(json.dumps(payload).encode('utf-8'))
+    except uploader.UploadError as e:
+        raise SyncError(f"Connection error: {e}")
+    if not 200 <= resp.status < 300:
+        raise SyncError(
+            f"HTTP Error {resp.status}: {resp.reason}", resp.status in CONTENT_ERRORS
+        )
+
+
+def ensure_spool(con: sqlite3.Connection):
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS sync_spool ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "digest TEXT NOT NULL UNIQUE, "
+        "record TEXT, "
+        "state INTEGER NOT NULL DEFAULT 0, "
+        "attempts INTEGER NOT NULL DEFAULT 0, "
+        "next_retry REAL NOT NULL DEFAULT 0, "
+        "last_error TEXT)"
+    )
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS sync_spool_state ON sync_spool (state, id)"
+    )
+
+
+def spool_stats(con: sqlite3.Connection) -> dict:
+    ensure_spool(con)
+    stats = {"pending": 0, "sent": 0, "rejected": 0}
+    names = {SPOOL_PENDING: "pending", SPOOL_SENT: "sent", SPOOL_REJECTED: "rejected"}
+    for state, count in con.execute("SELECT state, COUNT(*) FROM sync_spool GROUP BY state"):
+        stats[names.get(state, str(state))] = count
+    return stats
+
+
+def requeue_rejected(con: sqlite3.Connection) -> int:
+    """Queue rejected spool records for upload again, return their number."""
+    ensure_spool(con)
+    cur = con.execute(
+        "UPDATE sync_spool SET state = ?, attempts = 0, next_retry = 0, last_error = NULL "
+        "WHERE state = ?",
+        (SPOOL_PENDING, SPOOL_REJECTED),
+    )
+    return cur.rowcount
+
+
+def spool_new_records(con: sqlite3.Connection) -> int:
+    """Move records appended to the log since last call into the spool.
+
+    Records are keyed by content hash, so records seen before (e.g. after
+    the offset was reset) are not queued again. Returns number of queued
+    records.
+    """
+    last_offset = to_int(models.read_params(con).get("sync_log_offset"))
+    size = os.path.getsize(settings.ADI_LOG_PATH)
+    if size < last_offset:
+        # Log was truncated or replaced, start over, sent records are skipped
+        last_offset = 0
+    if size == last_offset:
+        return 0
+
+    count = 0
+    with open(settings.ADI_LOG_PATH, "rb") as f:
+        chunks = adif.iter_batches(
+            adif.iter_records(f, last_offset), SPOOL_CHUNK, settings.SYNC_BATCH_BYTES
+        )
+        for chunk in chunks:
+            cur = con.executemany(
+                "INSERT OR IGNORE INTO sync_spool (digest, record) VALUES (?, ?)",
+                [
+                    (hashlib.sha1(r).hexdigest(), r.decode("utf-8", errors="ignore"))
+                    for r, _ in chunk
+                ],
+            )
+            count += cur.rowcount
+            models.save_params(con, {"sync_log_offset": chunk[-1][1]})
+            db.commit(con)
+    return count
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(RETRY_MIN_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def drain_spool(con: sqlite3.Connection, config: dict, progress=None, force=False) -> str:
+    """Upload pending spool records in order, in batches.
+
+    Batch which failed to upload is kept with its attempt count and next
+    retry time, which is ignored with force. Batches refused by the server
+    are split until the refused record is found, so the other ones are
+    uploaded. A record refused SYNC_SPOOL_MAX_ATTEMPTS times is marked as
+    rejected so it doesn't block the queue.
+    """
+    records = 0
+    nbytes = 0
+    # Halved on every refused batch, doubled back on every uploaded one
+    limit = settings.SYNC_BATCH_RECORDS
+    while True:
+        now = time.time()
+        rows = con.execute(
+            "SELECT id, record, attempts, next_retry FROM sync_spool "
+            "WHERE state = ? ORDER BY id LIMIT ?",
+            (SPOOL_PENDING, limit),
+        ).fetchall()
+        batch = []
+        size = 0
+        for row in rows:
+            if row[3] > now and not force:
+                break
+            if batch and size + len(row[1]) > settings.SYNC_BATCH_BYTES:
+                break
+            batch.append(row)
+            size += len(row[1]) + 1
+        if not batch:
+            break
+
+        try:
+            upload_batch(config, [r[1] for r in batch])
+        except SyncError as e:
+            if e.rejected and len(batch) > 1:
+                limit = len(batch) // 2
+                continue
+            attempts = batch[0][2] + 1
+            con.executemany(
+                "UPDATE sync_spool SET attempts = attempts + 1, next_retry = ?, "
+                "state = ?, last_error = ? WHERE id = ?",
+                [
+                    (
+                        now + _retry_delay(attempts),
+                        SPOOL_REJECTED
+                        if e.rejected and r[2] + 1 >= settings.SYNC_SPOOL_MAX_ATTEMPTS
+                        else SPOOL_PENDING,
+                        str(e),
+                        r[0],
+                    )
+                    for r in batch
+                ],
+            )
+            con.commit()
+            if records:
+                raise SyncError(
+                    f"{e} (uploaded {records} records before the error)", e.rejected
+                )
+            raise
+
+        con.executemany(
+            "UPDATE sync_spool SET state = ?, record = NULL WHERE id = ?",
+            [(SPOOL_SENT, r[0]) for r in batch],
+        )
+        timestamp = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+        models.save_params(con, {"sync_timestamp": timestamp})
+        db.commit(con)
+        records += len(batch)
+        nbytes += size
+        limit = min(limit * 2, settings.SYNC_BATCH_RECORDS)
+        if progress:
+            progress(records, nbytes)
+
+    if records:
+        return f"Upload successful ({records} records, {nbytes} bytes)."
+    if rows:
+        retry = datetime.fromtimestamp(rows[0][3]).isoformat(timespec="seconds")
+        raise SyncError(f"Records are waiting for retry at {retry}.")
+    return "No new QSO records to upload."
+
+
+def run_sync(con: sqlite3.Connection, config: dict, progress=None, force=False) -> str:
+    """Spool new QSO records and upload them to Wavelog, return result message.
+
+    progress(records, bytes) is called after each uploaded batch. Raises
+    SyncError if upload fails, records stay in the spool for the next run.
+    """
+    ensure_spool(con)
+    if os.path.exists(settings.ADI_LOG_PATH):
+        spool_new_records(con)
+    else:
+        row = con.execute(
+            "SELECT 1 FROM sync_spool WHERE state = ? LIMIT 1", (SPOOL_PENDING,)
+        ).fetchone()
+        if row is None:
+            return f"Log file not found: {settings.ADI_LOG_PATH}"
+    return drain_spool(con, config, progress, force)
+
+
+# Job sources
+MANUAL = "manual"
+TIMER = "timer"
+WATCH = "watch"
+
+
+class SyncJob:
+    def __init__(self, job_id: int, config: dict | None, source: str):
+        self.id = job_id
+        self.config = config
+        self.source = source
+
+
+class SyncWorker:
+    """Single thread running uploads one at a time.
+
+    Triggers arriving while a job is waiting are merged into it. Automatic
+    uploads run every sync_delay seconds and, if sync_watch is enabled, a few
+    seconds after the log was appended. Failed ones are retried with
+    exponential backoff.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._thread = None
+        self._job_ids = itertools.count(1)
+        self._pending: SyncJob | None = None
+        self._next_run = None
+        self._failures = 0
+        self._watcher = None
+        self._status = {
+            "state": "idle",
+            "job_id": None,
+            "progress": None,
+            "last_result": None,
+            "records_sent": 0,
+            "bytes_sent": 0,
+            "failures": 0,
+            "next_run": None,
+        }
+
+    def start(self, delay: float = 0):
+        """Start worker thread, the first upload runs after delay seconds."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="sync", daemon=True)
+            self._next_run = time.monotonic() + delay
+            self._thread.start()
+
+    def trigger(self, config: dict | None = None) -> int:
+        """Queue manual upload and return its job id.
+
+        config overrides values stored in database (e.g. to test settings
+        before saving them).
+        """
+        return self._queue(MANUAL, config)
+
+    def log_changed(self):
+        """Queue upload of records appended to the log."""
+        self._queue(WATCH)
+
+    def _queue(self, source: str, config: dict | None = None) -> int:
+        with self._cond:
+            if self._pending is None:
+                self._pending = SyncJob(next(self._job_ids), config, source)
+            else:
+                if source == MANUAL:
+                    self._pending.source = MANUAL
+                if config:
+                    self._pending.config = config
+            self._cond.notify()
+            return self._pending.id
+
+    def reschedule(self, delay: int, watch: bool = False):
+        with self._cond:
+            self._failures = 0
+            self._next_run = time.monotonic() + delay if delay > 0 else None
+            self._cond.notify()
+        self._set_watch(watch)
+        self._publish_status()
+
+    def _set_watch(self, enabled: bool):
+        from . import watcher
+
+        # Uploads keep running on the timer if the log can't be watched
+        with self._cond:
+            if enabled and self._watcher is None:
+                try:
+                    log_watcher = watcher.LogWatcher(
+                        settings.ADI_LOG_PATH,
+                        self.log_changed,
+                        debounce=settings.SYNC_WATCH_DEBOUNCE,
+                        max_wait=settings.SYNC_WATCH_MAX_WAIT,
+                    )
+                    log_watcher.start()
+                except Exception:
+                    logger.exception("Can't start log watcher")
+                else:
+                    self._watcher = log_watcher
+            elif not enabled and self._watcher is not None:
+                try:
+                    self._watcher.stop()
+                except Exception:
+                    logger.exception("Can't stop log watcher")
+                self._watcher = None
+
+    def status(self) -> dict:
+        with self._cond:
+            status = dict(self._status)
+            status["failures"] = self._failures
+            if self._next_run is not None:
+                wait = max(0.0, self._next_run - time.monotonic())
+                status["next_run"] = datetime.fromtimestamp(time.time() + wait).isoformat(
+                    timespec="seconds"
+                )
+            else:
+                status["next_run"] = None
+            return status
+
+    def _take_job(self) -> SyncJob:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._next_run is not None and self._next_run <= now:
+                    self._next_run = None
+                    if self._pending is None:
+                        self._pending = SyncJob(next(self._job_ids), None, TIMER)
+                if self._pending is not None:
+                    job, self._pending = self._pending, None
+                    self._status.update(state="running", job_id=job.id, progress=None)
+                    return job
+                timeout = None if self._next_run is None else self._next_run - now
+                self._cond.wait(timeout)
+
+    def _progress(self, records, nbytes):
+        with self._cond:
+            self._status["progress"] = {"records": records, "bytes": nbytes}
+        self._publish_status()
+
+    def _publish_status(self):
+        events.publish("sync", self.status())
+
+    def _run_job(self, job: SyncJob) -> tuple[bool, str, int, bool]:
+        delay = 0
+        watch = False
+        con = db.connect()
+        try:
+            stored = read_config(con)
+            config = job.config if job.config and job.config.get("key") else stored
+            delay = to_int(stored.get("delay"))
+            watch = to_int(stored.get("watch")) > 0
+            if job.source == TIMER and delay <= 0 and not watch:
+                return True, "Auto sync disabled (delay=0).", delay, watch
+            if job.source == WATCH and not watch:
+                return True, "Log watch disabled.", delay, watch
+            msg = run_sync(con, config, self._progress, force=job.source == MANUAL)
+            return True, msg, delay, watch
+        except SyncError as e:
+            return False, str(e), delay, watch
+        except Exception as e:
+            logger.exception("Sync job %s failed", job.id)
+            return False, f"Sync failed: {e}", delay, watch
+        finally:
+            con.close()
+
+    def _loop(self):
+        while True:
+            job = self._take_job()
+            self._publish_status()
+            started = time.monotonic()
+            ok, msg, delay, watch = self._run_job(job)
+            self._set_watch(watch)
+            with self._cond:
+                progress = self._status["progress"] or {"records": 0, "bytes": 0}
+                self._status["records_sent"] += progress["records"]
+                self._status["bytes_sent"] += progress["bytes"]
+                self._status.update(
+                    state="idle",
+                    last_result={
+                        "job_id": job.id,
+                        "ok": ok,
+                        "msg": msg,
+                        "records": progress["records"],
+                        "bytes": progress["bytes"],
+                        "duration": round(time.monotonic() - started, 3),
+                        "finished": datetime.now().isoformat(timespec="seconds"),
+                    },
+                )
+                if ok:
+                    self._failures = 0
+                else:
+                    self._failures += 1
+                if (delay > 0 or watch) and self._next_run is None:
+                    if not ok:
+                        wait = min(
+                            RETRY_MIN_DELAY * 2 ** (self._failures - 1),
+                            delay if delay > 0 else RETRY_MAX_DELAY,
+                        )
+                        self._next_run = time.monotonic() + wait
+                    elif delay > 0:
+                        self._next_run = time.monotonic() + delay
+            metrics.observe_sync_job(
+                job.source, ok, time.monotonic() - started, progress["records"], progress["bytes"]
+            )
+            self._publish_status()
+            logger.info("Sync job %s: %s", job.id, msg)
+
+
+worker = SyncWorker()
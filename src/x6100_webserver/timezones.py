@@ -0,0 +1,79 @@
+"""System timezone via /etc/localtime symlink and index of available zones."""
+import os
+import threading
+import time
+
+ZONEINFO_PATH = "/usr/share/zoneinfo"
+LOCALTIME_PATH = "/etc/localtime"
+# Zoneinfo subtrees duplicating the main one
+_SKIP_DIRS = {"posix", "right"}
+
+_index_lock = threading.Lock()
+_index: tuple[str, ...] | None = None
+
+
+def _is_tzif(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == b"TZif"
+    except OSError:
+        return False
+
+
+def _build_index() -> tuple[str, ...]:
+    names = []
+    for dirpath, dirnames, filenames in os.walk(ZONEINFO_PATH):
+        if dirpath == ZONEINFO_PATH:
+            dirnames[:] = [x for x in dirnames if x not in _SKIP_DIRS]
+        rel = os.path.relpath(dirpath, ZONEINFO_PATH)
+        for filename in filenames:
+            # Tables like zone.tab, and "localtime"/"posixrules" copies
+            if "." in filename or filename in ("localtime", "posixrules", "Factory"):
+                continue
+            if _is_tzif(os.path.join(dirpath, filename)):
+                names.append(filename if rel == "." else f"{rel}/{filename}")
+    return tuple(sorted(names))
+
+
+def available() -> tuple[str, ...]:
+    """Return sorted names of installed zones, scanned once per process."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = _build_index()
+        return _index
+
+
+def current() -> str:
+    """Return name of the system timezone."""
+    try:
+        target = os.readlink(LOCALTIME_PATH)
+    except FileNotFoundError:
+        return "UTC"
+    target = os.path.normpath(os.path.join(os.path.dirname(LOCALTIME_PATH), target))
+    name = target.split("/zoneinfo/")[-1]
+    for prefix in _SKIP_DIRS:
+        if name.startswith(prefix + "/"):
+            return name[len(prefix) + 1:]
+    return name
+
+
+def set_current(name: str):
+    """Point /etc/localtime to zone name and apply it to this process.
+
+    The link is replaced atomically, so other processes never see it missing.
+    Raises ValueError for unknown zones.
+    """
+    if name not in available():
+        raise ValueError(f"Invalid timezone: {name}")
+    tmp_path = f"{LOCALTIME_PATH}.{os.getpid()}.tmp"
+    try:
+        os.symlink(os.path.join(ZONEINFO_PATH, name), tmp_path)
+        os.replace(tmp_path, LOCALTIME_PATH)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    time.tzset()
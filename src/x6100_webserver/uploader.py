@@ -0,0 +1,144 @@
+"""Keep-alive HTTP client for uploads.
+
+One persistent connection is kept per endpoint and TLS sessions are
+resumed when it has to be reopened. Request bodies are gzipped once the
+server advertises gzip in the Accept-Encoding response header (RFC 7694).
+"""
+import collections
+import gzip
+import http.client
+import ssl
+import threading
+import urllib.parse
+
+from . import settings
+
+Response = collections.namedtuple("Response", ["status", "reason", "headers", "body"])
+
+
+class UploadError(Exception):
+    pass
+
+
+class _HTTPConnection(http.client.HTTPConnection):
+    def __init__(self, host, port, connect_timeout, read_timeout):
+        super().__init__(host, port, timeout=connect_timeout)
+        self.read_timeout = read_timeout
+
+    def connect(self):
+        super().connect()
+        self.sock.settimeout(self.read_timeout)
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host, port, connect_timeout, read_timeout, context, tls_session):
+        super().__init__(host, port, timeout=connect_timeout, context=context)
+        self.read_timeout = read_timeout
+        self.tls_session = tls_session
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=self.host, session=self.tls_session
+        )
+        self.sock.settimeout(self.read_timeout)
+
+
+class UploadClient:
+    def __init__(self, url, connect_timeout=10.0, read_timeout=30.0, context=None):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise UploadError(f"Unsupported URL: {url}")
+        self.https = parsed.scheme == "https"
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = parsed.path or "/"
+        if parsed.query:
+            self.path += "?" + parsed.query
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # None until the server tells whether it accepts gzip bodies
+        self.gzip: bool | None = None
+        self._context = context
+        if self.https and self._context is None:
+            self._context = ssl.create_default_context()
+        self._tls_session = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            if self.https:
+                self._conn = _HTTPSConnection(
+                    self.host, self.port, self.connect_timeout, self.read_timeout,
+                    self._context, self._tls_session,
+                )
+            else:
+                self._conn = _HTTPConnection(
+                    self.host, self.port, self.connect_timeout, self.read_timeout
+                )
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _request(self, body: bytes, headers: dict) -> Response:
+        for attempt in range(2):
+            conn = self._connection()
+            reused = conn.sock is not None
+            try:
+                conn.request("POST", self.path, body, headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (ConnectionResetError, BrokenPipeError, http.client.RemoteDisconnected) as e:
+                self.close()
+                # Server has closed idle keep-alive connection, request was not processed
+                if reused and attempt == 0:
+                    continue
+                raise UploadError(str(e) or type(e).__name__)
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                raise UploadError(str(e) or type(e).__name__)
+            if self.https and conn.sock is not None:
+                self._tls_session = conn.sock.session
+            if resp.will_close:
+                self.close()
+            return Response(resp.status, resp.reason, resp.headers, data)
+
+    def post(self, body: bytes, content_type="application/json") -> Response:
+        with self._lock:
+            headers = {"Content-Type": content_type, "Accept": "application/json"}
+            if self.gzip:
+                resp = self._request(
+                    gzip.compress(body, compresslevel=6), {**headers, "Content-Encoding": "gzip"}
+                )
+                if resp.status != 415:
+                    return resp
+                self.gzip = False
+            resp = self._request(body, headers)
+            if self.gzip is None:
+                accept = resp.headers.get("Accept-Encoding", "")
+                codings = [x.split(";")[0].strip().lower() for x in accept.split(",")]
+                if "gzip" in codings:
+                    self.gzip = True
+            return resp
+
+
+_clients_lock = threading.Lock()
+_clients: dict[str, UploadClient] = {}
+
+
+def get_client(url: str) -> UploadClient:
+    """Return shared client for endpoint url."""
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = UploadClient(
+                url,
+                connect_timeout=settings.SYNC_CONNECT_TIMEOUT,
+                read_timeout=settings.SYNC_READ_TIMEOUT,
+            )
+            _clients[url] = client
+        return client
@@ -0,0 +1,174 @@
+"""Watching ADIF log for appended QSO records.
+
+Uses inotify on Linux, so the thread sleeps until the log is written.
+Falls back to polling file size and mtime if inotify is not available or
+the log can't be watched with it (e.g. missing directory or watch limit).
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int) -> int | None:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        return wd if wd >= 0 else None
+
+    def read(self):
+        """Yield (wd, mask, name) of pending events."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, name_len = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = data[pos:pos + name_len].rstrip(b"\0")
+            pos += name_len
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogWatcher:
+    """Call callback when file at path was appended or replaced.
+
+    Bursts of writes are merged: callback runs after debounce seconds
+    without writes, but no later than max_wait seconds after the first one.
+    """
+
+    def __init__(self, path, callback, debounce=2.0, max_wait=10.0, poll_interval=5.0):
+        self.path = path
+        self.callback = callback
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self._stop_r, self._stop_w = os.pipe()
+        # Guards the stop pipe, closed by the thread when it exits
+        self._stop_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="log-watcher", daemon=True)
+        self._first_change = None
+        self._last_change = None
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._stop_lock:
+            if self._stop_w is not None:
+                os.write(self._stop_w, b"x")
+
+    def _changed(self):
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        self._last_change = now
+
+    def _timeout(self, idle_timeout):
+        """Return select timeout, fire callback if debounce time passed."""
+        if self._first_change is None:
+            return idle_timeout
+        now = time.monotonic()
+        deadline = min(self._last_change + self.debounce, self._first_change + self.max_wait)
+        if now < deadline:
+            timeout = deadline - now
+            return timeout if idle_timeout is None else min(timeout, idle_timeout)
+        self._first_change = None
+        self._last_change = None
+        try:
+            self.callback()
+        except Exception:
+            logger.exception("Log watcher callback failed")
+        return idle_timeout
+
+    def _run(self):
+        try:
+            try:
+                inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.info("inotify is not available (%s), polling %s", e, self.path)
+                self._poll()
+            else:
+                try:
+                    try:
+                        self._watch(inotify)
+                    finally:
+                        inotify.close()
+                except OSError as e:
+                    logger.warning("Can't watch %s with inotify (%s), polling it", self.path, e)
+                    self._poll()
+        finally:
+            with self._stop_lock:
+                os.close(self._stop_r)
+                os.close(self._stop_w)
+                self._stop_w = None
+
+    def _watch(self, inotify: _Inotify):
+        dirname, basename = os.path.split(os.path.abspath(self.path))
+        dir_wd = inotify.add_watch(dirname, IN_CREATE | IN_MOVED_TO)
+        if dir_wd is None:
+            raise OSError(ctypes.get_errno(), f"Can't watch {dirname}")
+        file_mask = IN_MODIFY | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF
+        file_wd = inotify.add_watch(self.path, file_mask)
+        while True:
+            timeout = self._timeout(None)
+            readable, _, _ = select.select([inotify.fd, self._stop_r], [], [], timeout)
+            if self._stop_r in readable:
+                return
+            for wd, mask, name in inotify.read():
+                if wd == dir_wd and name == basename:
+                    file_wd = inotify.add_watch(self.path, file_mask)
+                    self._changed()
+                elif wd == file_wd:
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                        file_wd = None
+                    elif mask & (IN_MODIFY | IN_CLOSE_WRITE):
+                        self._changed()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _poll(self):
+        last = self._stat()
+        while True:
+            timeout = self._timeout(self.poll_interval)
+            readable, _, _ = select.select([self._stop_r], [], [], timeout)
+            if readable:
+                return
+            current = self._stat()
+            if current != last:
+                last = current
+                self._changed()
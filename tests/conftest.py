@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Test the tree itself, not an installed release
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,29 @@
+"""Parsing of imported band plans and batch edits."""
+import pytest
+
+from x6100_webserver import bulk
+
+
+def _band(params):
+    return {"name": "40m", "start_freq": 7000000, "stop_freq": 7300000, "params": params}
+
+
+def test_band_params_are_integers():
+    bands = bulk.bands_from_json([_band({"vfoa_freq": 7074000, "vfoa_mode": "2"})])
+    assert bands[0].params == {"vfoa_freq": 7074000, "vfoa_mode": 2}
+
+    bands = bulk.bands_from_csv("name,start_freq,stop_freq,vfoa_freq,vfoa_mode\n40m,7000000,7300000,7074000,\n")
+    assert bands[0].params == {"vfoa_freq": 7074000}
+
+
+@pytest.mark.parametrize("params", [[1, 2], "abc", {"vfoa_freq": "abc"}, {"vfoa_freq": None}])
+def test_invalid_band_params(params):
+    with pytest.raises(ValueError, match="Row 1: params"):
+        bulk.bands_from_json([_band(params)])
+    with pytest.raises(ValueError, match="Operation 1: params"):
+        bulk.batch_from_json({"ops": [{"op": "create", "table": "bands", "data": _band(params)}]})
+
+
+def test_invalid_band_params_csv():
+    with pytest.raises(ValueError, match="Row 2: params.vfoa_freq should be an integer"):
+        bulk.bands_from_csv("name,start_freq,stop_freq,vfoa_freq\n40m,7000000,7300000,abc\n")
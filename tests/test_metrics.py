@@ -0,0 +1,29 @@
+"""SQL statement counting of the metrics connection."""
+from x6100_webserver import db, metrics
+
+
+def _counts() -> dict[str, float]:
+    prefix = "x6100_sql_statements_total{statement="
+    return {
+        line[len(prefix):].split("}")[0].strip('"'): float(line.rsplit(" ", 1)[1])
+        for line in metrics.render().splitlines()
+        if line.startswith(prefix)
+    }
+
+
+def _diff(before: dict, after: dict) -> dict:
+    return {k: v - before.get(k, 0) for k, v in after.items() if v != before.get(k, 0)}
+
+
+def test_cursor_and_context_manager_are_counted():
+    con = db.connect(":memory:")
+    con.execute("CREATE TABLE t (x INTEGER)")
+    before = _counts()
+    with con:
+        cur = con.cursor()
+        cur.execute("INSERT INTO t VALUES (1)")
+        cur.executemany("INSERT INTO t VALUES (?)", [(2,), (3,)])
+        con.execute("UPDATE t SET x = x + 1")
+    assert _diff(before, _counts()) == {"INSERT": 2, "UPDATE": 1, "COMMIT": 1}
+    assert con.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 3
+    con.close()
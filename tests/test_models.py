@@ -0,0 +1,50 @@
+"""Caches of the models and changes made by other processes."""
+import sqlite3
+
+import pytest
+
+from x6100_webserver import db, models
+
+SCHEMA = """
+CREATE TABLE params (name TEXT PRIMARY KEY ON CONFLICT REPLACE, val TEXT);
+CREATE TABLE bands (
+    id INTEGER PRIMARY KEY, name TEXT, start_freq INTEGER, stop_freq INTEGER, type INTEGER
+);
+CREATE TABLE band_params (
+    bands_id INTEGER, name TEXT, val INTEGER, UNIQUE(bands_id, name) ON CONFLICT REPLACE
+);
+CREATE TABLE digital_modes (
+    id INTEGER PRIMARY KEY, label TEXT, freq INTEGER, mode INTEGER, type INTEGER
+);
+INSERT INTO bands VALUES (1, '40m', 7000000, 7300000, 1);
+INSERT INTO band_params VALUES (1, 'vfoa_freq', 7074000);
+"""
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "test.db")
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+    con.close()
+    return path
+
+
+def test_external_write_invalidates_cache(path):
+    con = db.connect(path)
+    assert models.read_band_index(con).get(1).params["vfoa_freq"] == 7074000
+    version = models.data_version("bands")
+
+    # Nothing changed, cache is used as is
+    assert models.read_band_index(con) is models.read_band_index(con)
+    assert models.data_version("bands") == version
+
+    # The GUI tunes the VFO
+    gui = sqlite3.connect(path)
+    with gui:
+        gui.execute("INSERT INTO band_params VALUES (1, 'vfoa_freq', 7100000)")
+    gui.close()
+
+    assert models.read_band_index(con).get(1).params["vfoa_freq"] == 7100000
+    assert models.data_version("bands")[0] > version[0]
+    con.close()
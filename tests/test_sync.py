@@ -0,0 +1,122 @@
+"""Spool upload against a stand-in Wavelog server answering with given statuses."""
+import http.server
+import json
+import threading
+
+import pytest
+
+from x6100_webserver import db, models, settings, sync
+
+RECORDS = 250
+
+
+class WavelogHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    status = 201
+    # Batches containing this call are refused with 400
+    bad_call = None
+    received = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        status = self.status
+        if self.bad_call is not None and f"<CALL:{len(self.bad_call)}>{self.bad_call}" in body["string"]:
+            status = 400
+        if 200 <= status < 300:
+            self.received.extend(body["string"].split("\n"))
+        out = b'{"status":"ok"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def wavelog():
+    """Start server, return its handler class to set the answers."""
+    handler = type("Handler", (WavelogHandler,), {"received": []})
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    handler.endpoint = f"http://127.0.0.1:{srv.server_address[1]}/index.php/api/qso"
+    yield handler
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def con(tmp_path, monkeypatch):
+    log_path = tmp_path / "log.adi"
+    with open(log_path, "w") as f:
+        f.write("<ADIF_VER:5>3.1.0 <EOH>\n")
+        for i in range(RECORDS):
+            call = f"K{i:04d}"
+            f.write(f"<CALL:{len(call)}>{call} <MODE:3>FT8 <EOR>\n")
+    monkeypatch.setattr(settings, "ADI_LOG_PATH", str(log_path))
+    con = db.connect(str(tmp_path / "test.db"))
+    con.execute("CREATE TABLE params (name TEXT PRIMARY KEY ON CONFLICT REPLACE, val TEXT)")
+    con.commit()
+    # Params of the previous test's database are cached
+    models._invalidate_params_cache()
+    yield con
+    con.close()
+
+
+def _config(wavelog):
+    return {"key": "test", "station_profile_id": "1", "endpoint": wavelog.endpoint}
+
+
+def test_created_is_success(con, wavelog):
+    wavelog.status = 201
+    assert sync.run_sync(con, _config(wavelog)).startswith("Upload successful")
+    assert sync.spool_stats(con) == {"pending": 0, "sent": RECORDS, "rejected": 0}
+
+    assert sync.run_sync(con, _config(wavelog)) == "No new QSO records to upload."
+    assert len(wavelog.received) == RECORDS
+
+
+def test_unauthorized_keeps_records_pending(con, wavelog):
+    wavelog.status = 401
+    for _ in range(settings.SYNC_SPOOL_MAX_ATTEMPTS + 1):
+        with pytest.raises(sync.SyncError, match="401"):
+            sync.run_sync(con, _config(wavelog), force=True)
+    assert sync.spool_stats(con) == {"pending": RECORDS, "sent": 0, "rejected": 0}
+
+    wavelog.status = 200
+    sync.run_sync(con, _config(wavelog), force=True)
+    assert sync.spool_stats(con) == {"pending": 0, "sent": RECORDS, "rejected": 0}
+
+
+def test_refused_record_is_rejected_alone(con, wavelog):
+    wavelog.bad_call = "K0042"
+    for _ in range(settings.SYNC_SPOOL_MAX_ATTEMPTS):
+        with pytest.raises(sync.SyncError, match="400"):
+            sync.run_sync(con, _config(wavelog), force=True)
+    assert sync.spool_stats(con) == {"pending": RECORDS - 42 - 1, "sent": 42, "rejected": 1}
+
+    sync.run_sync(con, _config(wavelog), force=True)
+    assert sync.spool_stats(con) == {"pending": 0, "sent": RECORDS - 1, "rejected": 1}
+    assert not any("K0042" in r for r in wavelog.received)
+
+    wavelog.bad_call = None
+    assert sync.requeue_rejected(con) == 1
+    sync.run_sync(con, _config(wavelog), force=True)
+    assert sync.spool_stats(con) == {"pending": 0, "sent": RECORDS, "rejected": 0}
+
+
+def test_truncated_log_is_read_again(con, wavelog):
+    sync.run_sync(con, _config(wavelog))
+    assert sync.spool_stats(con)["sent"] == RECORDS
+
+    # Log replaced with a shorter one, one of its QSOs was sent before
+    with open(settings.ADI_LOG_PATH, "w") as f:
+        f.write("<ADIF_VER:5>3.1.0 <EOH>\n")
+        f.write("<CALL:5>K0000 <MODE:3>FT8 <EOR>\n")
+        f.write("<CALL:5>N0NEW <MODE:3>FT8 <EOR>\n")
+    assert sync.run_sync(con, _config(wavelog)).startswith("Upload successful (1 records")
+    assert sync.spool_stats(con) == {"pending": 0, "sent": RECORDS + 1, "rejected": 0}
+    assert wavelog.received[-1].startswith("<CALL:5>N0NEW")
@@ -0,0 +1,51 @@
+"""Log watcher with inotify and its polling fallback."""
+import os
+import threading
+import time
+
+from x6100_webserver import watcher
+
+
+def _watch(path):
+    changed = threading.Event()
+    log_watcher = watcher.LogWatcher(path, changed.set, debounce=0.05, poll_interval=0.05)
+    log_watcher.start()
+    # Changes made before the watch is set up aren't noticed
+    time.sleep(0.2)
+    return log_watcher, changed
+
+
+def _stop(log_watcher):
+    log_watcher.stop()
+    log_watcher._thread.join(5)
+    assert not log_watcher._thread.is_alive()
+
+
+def test_append(tmp_path):
+    path = tmp_path / "log.adi"
+    path.write_text("")
+    log_watcher, changed = _watch(str(path))
+    try:
+        with open(path, "a") as f:
+            f.write("<EOR>\n")
+        assert changed.wait(5)
+    finally:
+        _stop(log_watcher)
+
+
+def test_missing_dir_is_polled(tmp_path):
+    path = tmp_path / "logs" / "log.adi"
+    log_watcher, changed = _watch(str(path))
+    try:
+        os.mkdir(path.parent)
+        path.write_text("<EOR>\n")
+        assert changed.wait(5)
+        assert log_watcher._thread.is_alive()
+    finally:
+        _stop(log_watcher)
+
+
+def test_stop_after_exit(tmp_path):
+    log_watcher, _ = _watch(str(tmp_path / "log.adi"))
+    _stop(log_watcher)
+    log_watcher.stop()